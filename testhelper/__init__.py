@@ -1,21 +1,773 @@
+import asyncio
+import atexit
+import bisect
+import cProfile
+import collections.abc
+import contextvars
+import functools
+import gc
+import inspect
+import ipaddress
+import math
+import os
+import pstats
+import random
+import sqlite3
+import sys
+import threading
+import time
+import tracemalloc
+import types
 import unittest
-import uuid
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
 from base64_url import base64_url_encode, base64_url_decode
 
+try:
+	import numpy
+except ImportError:
+	# oracles fall back to plain python
+	numpy = None
+
+# bool is a subclass of int so this covers int, string, and bool properties
+base_types = (int, str)
+
+# per class (slot names, has __dict__) plans built by attribute_plan
+attribute_plans = {}
+
+def attribute_plan(class_name):
+	plan = attribute_plans.get(class_name)
+	if plan is None:
+		slots = []
+		for base in class_name.__mro__:
+			base_slots = base.__dict__.get('__slots__', ())
+			if isinstance(base_slots, str):
+				base_slots = [base_slots]
+			for slot in base_slots:
+				if slot in ('__dict__', '__weakref__'):
+					continue
+				# private slots are stored under their mangled names
+				if slot.startswith('__') and not slot.endswith('__'):
+					slot = '_' + base.__name__.lstrip('_') + slot
+				if slot not in slots:
+					slots.append(slot)
+		plan = (
+			tuple(slots),
+			bool(class_name.__dictoffset__),
+		)
+		attribute_plans[class_name] = plan
+	return plan
+
 def compare_base_attributes(object1, object2):
 	# check if all int, string, and bool properties of two objects are equal
-	for attr, value in object1.__dict__.items():
-		if (
-				isinstance(value, int)
-				or isinstance(value, str)
-				or isinstance(value, bool)
-			):
-			if value != getattr(object2, attr):
+	slots, has_dict = attribute_plan(type(object1))
+	if has_dict:
+		for attr, value in object1.__dict__.items():
+			if isinstance(value, base_types) and value != getattr(object2, attr):
 				return False
+	for attr in slots:
+		try:
+			value = getattr(object1, attr)
+		except AttributeError:
+			# unassigned slot
+			continue
+		if isinstance(value, base_types) and value != getattr(object2, attr):
+			return False
 	return True
 
+def compare_base_attributes_batch(objects1, objects2):
+	# compare two equal length lists of objects pairwise
+	objects1 = list(objects1)
+	objects2 = list(objects2)
+	if len(objects1) != len(objects2):
+		return False
+	return all(map(compare_base_attributes, objects1, objects2))
+
+# helper parameters holding the data layer callables under test
+callable_parameters = [
+	'create',
+	'create_many',
+	'get',
+	'search',
+	'count',
+	'delete',
+	'search_after',
+]
+
+# perf_counter_ns samples keyed by (helper label, callable parameter)
+timings = {}
+
+# pstats.Stats merged across invocations keyed by the .pstats path they're
+# written to at exit
+profiles = {}
+
+# ids from TestHelper.id_factory are derived from this and the test id, so
+# setting TESTHELPER_SEED regenerates the ids of an earlier run
+id_seed = int(os.environ.get('TESTHELPER_SEED') or random.randrange(1 << 32))
+
+class IdFactory:
+	# reproducible ids generated in bulk from a single random buffer
+	used = False
+
+	def __init__(self, seed):
+		self.random = random.Random(seed)
+		IdFactory.used = True
+
+	def ids(self, count):
+		# paired (id_bytes, base64_url id) tuples
+		buffer = memoryview(self.random.randbytes(16 * count))
+		return [
+			(
+				id_bytes,
+				base64_url_encode(id_bytes),
+			)
+			for id_bytes in (
+				buffer[offset:offset + 16].tobytes()
+				for offset in range(0, 16 * count, 16)
+			)
+		]
+
+def percentile(samples, p):
+	# nearest rank percentile of already sorted samples
+	return samples[max(0, math.ceil(p / 100 * len(samples)) - 1)]
+
+def measure(f, repeat):
+	# calls f repeat times, returning its last result and the sorted samples
+	samples = []
+	for i in range(repeat):
+		start = time.perf_counter_ns()
+		result = f()
+		samples.append(time.perf_counter_ns() - start)
+	samples.sort()
+	return result, samples
+
+def latency_summary(samples):
+	samples = sorted(samples)
+	return {
+		'calls': len(samples),
+		'p50': percentile(samples, 50),
+		'p95': percentile(samples, 95),
+		'p99': percentile(samples, 99),
+		'max': samples[-1],
+	}
+
+def report_latency(label, samples, stream=None):
+	# writes a one line percentile summary of perf_counter_ns samples and
+	# returns it
+	summary = latency_summary(samples)
+	(stream or sys.stderr).write(
+		'{}: {} calls, p50 {:.3f} ms, p95 {:.3f} ms, p99 {:.3f} ms,'
+		' max {:.3f} ms\n'.format(
+			label,
+			summary['calls'],
+			summary['p50'] / 1e6,
+			summary['p95'] / 1e6,
+			summary['p99'] / 1e6,
+			summary['max'] / 1e6,
+		)
+	)
+	return summary
+
+def reject_outliers(samples):
+	# drops samples outside 1.5 interquartile ranges of the middle half,
+	# e.g. calls interrupted by garbage collection or scheduling
+	samples = sorted(samples)
+	q1 = percentile(samples, 25)
+	q3 = percentile(samples, 75)
+	low = q1 - 1.5 * (q3 - q1)
+	high = q3 + 1.5 * (q3 - q1)
+	return [sample for sample in samples if low <= sample <= high]
+
+def latency_table(samples, kept):
+	# percentiles of all samples next to those left by reject_outliers
+	samples = sorted(samples)
+	kept = sorted(kept)
+	lines = ['{:<10} {:>10} {:>10}'.format('', 'all ms', 'kept ms')]
+	lines.append('{:<10} {:>10} {:>10}'.format('calls', len(samples), len(kept)))
+	for name, p in [('p50', 50), ('p90', 90), ('p95', 95), ('p99', 99)]:
+		lines.append('{:<10} {:>10.3f} {:>10.3f}'.format(
+			name,
+			percentile(samples, p) / 1e6,
+			percentile(kept, p) / 1e6,
+		))
+	lines.append('{:<10} {:>10.3f} {:>10.3f}'.format(
+		'max',
+		samples[-1] / 1e6,
+		kept[-1] / 1e6,
+	))
+	return '\n'.join(lines)
+
+def timed(f, helper_name, operation, samples=None):
+	# samples collects perf_counter_ns per operation for a single invocation,
+	# otherwise they go to the end of run report
+	def record(elapsed, kwargs):
+		if samples is not None:
+			samples.setdefault(operation, []).append(elapsed)
+			return
+		# searches are reported per filter field, e.g.
+		# search_by_id[filter=user_id]
+		label = helper_name
+		filter = kwargs.get('filter')
+		if isinstance(filter, dict) and filter:
+			label += '[filter=' + ','.join(sorted(map(str, filter))) + ']'
+		timings.setdefault((label, operation), []).append(elapsed)
+
+	def wrapper(*args, **kwargs):
+		start = time.perf_counter_ns()
+		try:
+			result = f(*args, **kwargs)
+		except BaseException:
+			record(time.perf_counter_ns() - start, kwargs)
+			raise
+		elapsed = time.perf_counter_ns() - start
+		if isinstance(result, collections.abc.Iterator):
+			# lazily yielded results are timed until they're exhausted
+			return iterate_timed(
+				result,
+				elapsed,
+				lambda elapsed: record(elapsed, kwargs),
+			)
+		record(elapsed, kwargs)
+		return result
+	return wrapper
+
+def iterate_timed(iterator, elapsed, record):
+	# adds the time spent in each next() to elapsed and records the total
+	# once the iterator is exhausted or closed
+	try:
+		while True:
+			start = time.perf_counter_ns()
+			try:
+				object = next(iterator)
+			except StopIteration:
+				return
+			finally:
+				elapsed += time.perf_counter_ns() - start
+			yield object
+	finally:
+		record(elapsed)
+
+def write_reports(stream=None):
+	# called at exit, and by testhelper.runner once the results of its
+	# shards are merged since pool workers don't run exit handlers
+	stream = stream or sys.stderr
+	if profiles:
+		stream.write('\n')
+	for path, stats in sorted(profiles.items()):
+		os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+		stats.dump_stats(path)
+		stream.write('profile written to {}\n'.format(path))
+	profiles.clear()
+	if IdFactory.used:
+		stream.write('\nids generated with TESTHELPER_SEED={}\n'.format(id_seed))
+		IdFactory.used = False
+	if not timings:
+		return
+	row = '{:<48} {:<12} {:>7} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f}\n'
+	stream.write('\n{:<48} {:<12} {:>7} {:>10} {:>10} {:>10} {:>10}\n'.format(
+		'helper',
+		'callable',
+		'calls',
+		'p50 ms',
+		'p95 ms',
+		'p99 ms',
+		'max ms',
+	))
+	for (label, operation), samples in sorted(timings.items()):
+		samples = sorted(samples)
+		stream.write(row.format(
+			label,
+			operation,
+			len(samples),
+			percentile(samples, 50) / 1e6,
+			percentile(samples, 95) / 1e6,
+			percentile(samples, 99) / 1e6,
+			samples[-1] / 1e6,
+		))
+	timings.clear()
+
+atexit.register(write_reports)
+
+def result_objects(objects):
+	# search results are containers with values(), or plain iterables
+	if hasattr(objects, 'values'):
+		return objects.values()
+	return objects
+
+class ResultView:
+	# indexes a search result by id_bytes once so that repeated membership
+	# checks don't each go through the container's linear scan
+	# lazily yielded results are consumed in a single pass, keeping only
+	# their ids, their length, and the first keep objects
+	def __init__(self, objects, keep=0):
+		self.objects = objects
+		self.streamed = isinstance(objects, collections.abc.Iterator)
+		if self.streamed:
+			self.ids = set()
+			self.head = []
+			self.length = 0
+			for object in objects:
+				self.add(object, keep)
+			return
+		try:
+			self.ids = {
+				object.id_bytes for object in result_objects(objects)
+			}
+		except (AttributeError, TypeError):
+			# containers that only support in keep their own membership test
+			self.ids = None
+
+	def add(self, object, keep=0):
+		self.ids.add(object.id_bytes)
+		if self.length < keep:
+			self.head.append(object)
+		self.length += 1
+
+	def __contains__(self, object):
+		if self.ids is None or not hasattr(object, 'id_bytes'):
+			if self.streamed:
+				return False
+			return object in self.objects
+		return object.id_bytes in self.ids
+
+	def __len__(self):
+		if self.streamed:
+			return self.length
+		return len(self.objects)
+
+	def values(self):
+		if self.streamed:
+			return self.head
+		return self.objects.values()
+
+def traced_view(f, keep=0):
+	# the ResultView of f() and the most memory f and the iteration of its
+	# result held at once above where they started, leaving out what the
+	# view itself allocates, so it stays flat for streamed results however
+	# many rows they yield while materialized results grow with their size
+	# tracemalloc has to be tracing
+	base = tracemalloc.get_traced_memory()[0]
+	tracemalloc.reset_peak()
+	objects = f()
+	current, peak = tracemalloc.get_traced_memory()
+	held = peak - base
+	if isinstance(objects, ResultView):
+		return objects, held
+	if not isinstance(objects, collections.abc.Iterator):
+		return ResultView(objects, keep), held
+	view = ResultView(iter(()), keep)
+	view.objects = objects
+	ours = tracemalloc.get_traced_memory()[0] - current
+	while True:
+		tracemalloc.reset_peak()
+		try:
+			object = next(objects)
+		except StopIteration:
+			break
+		current, peak = tracemalloc.get_traced_memory()
+		held = max(held, peak - base - ours)
+		view.add(object, keep)
+		# the view also keeps the id_bytes the search allocated
+		ours += tracemalloc.get_traced_memory()[0] - current
+		ours += sys.getsizeof(object.id_bytes)
+	return view, held
+
+def listed(value):
+	if isinstance(value, list):
+		return value
+	return [value]
+
+class FilterModel:
+	# in memory reference for search filters over generated rows, indexed
+	# with sorted arrays and bisect for cutoffs and prefixes and with hash
+	# sets for everything else
+	# each filter key maps to a function returning the set of matching row
+	# positions for a filter value
+	def __init__(self, rows):
+		self.everything = set(range(rows))
+		self.filters = {}
+
+	def sorted_index(self, values):
+		order = sorted(range(len(values)), key=values.__getitem__)
+		return order, [values[position] for position in order]
+
+	def hashed_index(self, values):
+		index = {}
+		for position, value in enumerate(values):
+			index.setdefault(value, set()).add(position)
+		return index
+
+	def add_id(self, filter_field, values):
+		index = self.hashed_index(values)
+
+		def matches(value):
+			positions = set()
+			for id in listed(value):
+				positions |= index.get(id, set())
+			return positions
+		self.filters[filter_field] = matches
+
+	def add_cutoff(
+			self,
+			filter_field_less_than,
+			filter_field_greater_than,
+			values,
+		):
+		order, sorted_values = self.sorted_index(values)
+		self.filters[filter_field_less_than] = lambda value: set(
+			order[:bisect.bisect_left(sorted_values, value)]
+		)
+		self.filters[filter_field_greater_than] = lambda value: set(
+			order[bisect.bisect_right(sorted_values, value):]
+		)
+
+	def add_string_like(self, filter_field, values):
+		# exact and prefix% patterns of lowercase strings only
+		order, sorted_values = self.sorted_index(values)
+
+		def matches(value):
+			positions = set()
+			for pattern in listed(value):
+				if pattern.endswith('%'):
+					low = bisect.bisect_left(sorted_values, pattern[:-1])
+					high = bisect.bisect_left(
+						sorted_values,
+						pattern[:-1] + '\U0010ffff',
+					)
+				else:
+					low = bisect.bisect_left(sorted_values, pattern)
+					high = bisect.bisect_right(sorted_values, pattern)
+				positions.update(order[low:high])
+			return positions
+		self.filters[filter_field] = matches
+
+	def add_bool(self, filter_field, values):
+		true = {position for position, value in enumerate(values) if value}
+		false = self.everything - true
+		self.filters[filter_field] = lambda value: set(true if value else false)
+
+	def add_remote_origin(self, filter_field, values):
+		index = self.hashed_index(values)
+
+		def matches(value):
+			positions = set()
+			for remote_origin in listed(value):
+				positions |= index.get(remote_origin, set())
+			return positions
+		self.filters['with_' + filter_field] = matches
+		self.filters['without_' + filter_field] = (
+			lambda value: self.everything - matches(value)
+		)
+
+	def add_group_bits(self, values, bits):
+		groups = [
+			{position for position, value in enumerate(values) if value & 1 << bit}
+			for bit in range(bits)
+		]
+
+		def matches(value):
+			positions = set()
+			for bit in range(bits):
+				if value & 1 << bit:
+					positions |= groups[bit]
+			return positions
+		self.filters['with_group_bits'] = matches
+		self.filters['without_group_bits'] = (
+			lambda value: self.everything - matches(value)
+		)
+
+	def matches(self, filter):
+		positions = self.everything
+		for filter_field, value in filter.items():
+			positions = positions & self.filters[filter_field](value)
+		return positions
+
+# growth functions for the complexity classes accepted by search_scaling
+complexity_classes = {
+	'constant': lambda n: 1,
+	'log': lambda n: math.log2(n),
+	'linear': lambda n: n,
+	'linearithmic': lambda n: n * math.log2(n),
+}
+
+# nesting depth of helper invocations and the isolation and snapshot hooks
+# AsyncTestHelper bridges for one, kept per context so that concurrent
+# helpers each running in their own worker thread don't share them
+helper_depth = contextvars.ContextVar('helper_depth', default=0)
+bridged_hooks = contextvars.ContextVar('bridged_hooks', default=None)
+
+def helper(f=None, restores=False):
+	# helpers seed their own rows through create, so each outermost helper
+	# invocation is run inside the configured isolation and rolled back after
+	# helpers that call other helpers only isolate once
+	# restores marks helpers that tolerate background rows, the only ones
+	# the class snapshot is restored before, see TestHelper.seed_snapshot
+	if f is None:
+		return functools.partial(helper, restores=restores)
+	signature = inspect.signature(f)
+
+	@functools.wraps(f)
+	def wrapper(self, *args, **kwargs):
+		if helper_depth.get():
+			return f(self, *args, **kwargs)
+		budget_samples = {} if self.latency_budgets else None
+		if self.instrument or self.latency_budgets:
+			bound = signature.bind(self, *args, **kwargs)
+			for name in callable_parameters:
+				if not bound.arguments.get(name):
+					continue
+				if self.instrument:
+					bound.arguments[name] = timed(
+						bound.arguments[name],
+						f.__name__,
+						name,
+					)
+				if self.latency_budgets:
+					bound.arguments[name] = timed(
+						bound.arguments[name],
+						f.__name__,
+						name,
+						budget_samples,
+					)
+			args = bound.args[1:]
+			kwargs = bound.kwargs
+		hooks = bridged_hooks.get() or self
+		snapshot = hooks.snapshot if restores else None
+		background_ids = self.background_ids
+		if snapshot:
+			# restoring needs the connection outside of a transaction so it
+			# happens before isolation begins
+			snapshot.restore()
+			if snapshot.ids is not None and background_ids is None:
+				self.background_ids = snapshot.ids
+		isolation = hooks.isolation
+		if isolation:
+			isolation.begin()
+		if self.profile:
+			profiler = cProfile.Profile()
+		depth = helper_depth.set(1)
+		failure = None
+		try:
+			if self.profile:
+				result = profiler.runcall(f, self, *args, **kwargs)
+			else:
+				result = f(self, *args, **kwargs)
+			if budget_samples:
+				self.check_latency_budgets(f.__name__, budget_samples)
+			return result
+		except BaseException as error:
+			failure = error
+			raise
+		finally:
+			helper_depth.reset(depth)
+			if self.profile:
+				path = os.path.join(self.profile, f.__name__ + '.pstats')
+				if path in profiles:
+					profiles[path].add(profiler)
+				else:
+					profiles[path] = pstats.Stats(profiler)
+			self.background_ids = background_ids
+			if isolation and failure is None:
+				isolation.rollback()
+			elif isolation:
+				try:
+					isolation.rollback()
+				except Exception as error:
+					# the helper's own failure stays the one raised, with the
+					# rollback error noted on it
+					if hasattr(failure, 'add_note'):
+						failure.add_note('isolation rollback failed: {}'.format(
+							error,
+						))
+			if snapshot:
+				snapshot.clear()
+	wrapper.helper = True
+	return wrapper
+
+class IsolatedConnection(sqlite3.Connection):
+	# connection factory for sqlite3.connect that, while an isolation
+	# savepoint is open, turns commits and rollbacks into releases of and
+	# rollbacks to a nested savepoint, so data layers that commit after
+	# every write or roll back after an IntegrityError can still be rolled
+	# back as a whole
+	isolated = False
+	write_savepoint = 'testhelper_write'
+
+	def isolate(self):
+		self.execute('SAVEPOINT ' + self.write_savepoint)
+		self.isolated = True
+
+	def commit(self):
+		if not self.isolated:
+			super().commit()
+			return
+		self.execute('RELEASE ' + self.write_savepoint)
+		self.execute('SAVEPOINT ' + self.write_savepoint)
+
+	def rollback(self):
+		if not self.isolated:
+			super().rollback()
+			return
+		# rolling back to a savepoint leaves it open
+		self.execute('ROLLBACK TO ' + self.write_savepoint)
+
+class SQLiteSavepointIsolation:
+	def __init__(self, connection, name='testhelper'):
+		self.connection = connection
+		self.name = name
+
+	def begin(self):
+		# a savepoint outside of a transaction opens one, so this works
+		# whether or not the data layer already has a transaction open
+		self.connection.execute('SAVEPOINT ' + self.name)
+		if isinstance(self.connection, IsolatedConnection):
+			self.connection.isolate()
+
+	def rollback(self):
+		if isinstance(self.connection, IsolatedConnection):
+			self.connection.isolated = False
+		if not self.connection.in_transaction:
+			# a commit inside the helper released the savepoint
+			raise RuntimeError(
+				'isolation savepoint was committed, use IsolatedConnection'
+				+ ' as the sqlite3.connect factory'
+			)
+		self.connection.execute('ROLLBACK TO ' + self.name)
+		self.connection.execute('RELEASE ' + self.name)
+
+class SQLiteSnapshot:
+	# in memory copy of a seeded sqlite3 database taken with the backup api
+	# and copied back over the connection instead of seeding it again
+	# ids are the id_bytes of the seeded rows, if known, which the helpers
+	# then leave out of their result counts
+	# blank is an image of the database from before seeding, put back by
+	# clear() once a restoring helper is done
+	def __init__(self, connection, ids=None, blank=None):
+		self.connection = connection
+		self.ids = ids
+		self.blank = blank
+		self.image = sqlite3.connect(':memory:')
+		connection.backup(self.image)
+
+	def restore(self):
+		self.image.backup(self.connection)
+
+	def clear(self):
+		if self.blank is not None:
+			self.blank.backup(self.connection)
+
+# statements that only manage transactions don't count towards query budgets
+transaction_statements = (
+	'BEGIN',
+	'COMMIT',
+	'END',
+	'ROLLBACK',
+	'SAVEPOINT',
+	'RELEASE',
+)
+
+class RecordingCursor:
+	def __init__(self, cursor, recorder):
+		self.cursor = cursor
+		self.recorder = recorder
+
+	def execute(self, operation, *args, **kwargs):
+		self.recorder.record(operation)
+		return self.cursor.execute(operation, *args, **kwargs)
+
+	def executemany(self, operation, *args, **kwargs):
+		self.recorder.record(operation)
+		return self.cursor.executemany(operation, *args, **kwargs)
+
+	def __iter__(self):
+		return iter(self.cursor)
+
+	def __getattr__(self, name):
+		return getattr(self.cursor, name)
+
+class RecordingConnection:
+	def __init__(self, connection, recorder):
+		self.connection = connection
+		self.recorder = recorder
+
+	def cursor(self, *args, **kwargs):
+		return RecordingCursor(
+			self.connection.cursor(*args, **kwargs),
+			self.recorder,
+		)
+
+	def execute(self, *args, **kwargs):
+		# sqlite3 shortcut methods run on a cursor of their own
+		return self.cursor().execute(*args, **kwargs)
+
+	def executemany(self, *args, **kwargs):
+		return self.cursor().executemany(*args, **kwargs)
+
+	def __getattr__(self, name):
+		return getattr(self.connection, name)
+
+class StatementRecorder:
+	# records the statements executed on a sqlite3 connection through its
+	# trace callback, other DB-API connections can be passed through wrap()
+	# and the wrapped connection handed to the data layer instead
+	# statements are only recorded between start() and stop(), which nest,
+	# and dropped again after the outermost stop() so they aren't kept for
+	# the rest of the run
+	def __init__(self, connection=None):
+		self.statements = []
+		self.connection = connection
+		self.active = 0
+
+	def wrap(self, connection):
+		return RecordingConnection(connection, self)
+
+	def record(self, statement):
+		if self.active:
+			self.statements.append(statement)
+
+	def start(self):
+		# returns the position to pass to queries() once f has run
+		self.active += 1
+		if 1 == self.active and self.connection is not None:
+			self.connection.set_trace_callback(self.statements.append)
+		return len(self.statements)
+
+	def stop(self):
+		self.active -= 1
+		if not self.active:
+			if self.connection is not None:
+				self.connection.set_trace_callback(None)
+			self.statements.clear()
+
+	def close(self):
+		if self.connection is not None:
+			self.connection.set_trace_callback(None)
+		self.active = 0
+		self.statements.clear()
+
+	def plan(self, statement):
+		# EXPLAIN QUERY PLAN details for a recorded statement, which the
+		# trace callback passes with its parameters already expanded
+		self.connection.set_trace_callback(None)
+		try:
+			return [
+				row[-1] for row in self.connection.execute(
+					'EXPLAIN QUERY PLAN ' + statement
+				)
+			]
+		finally:
+			if self.active:
+				self.connection.set_trace_callback(self.statements.append)
+
+	def queries(self, start=0):
+		# statements recorded since start, without transaction control
+		return [
+			statement for statement in self.statements[start:]
+			if not statement.lstrip().upper().startswith(transaction_statements)
+		]
+
 invalid_ids = [
 	'not a valid base64_url string',
 	'invalid_padding_for_base64_url_id',
@@ -71,6 +823,75 @@ invalid_group_bits = [
 invalid_strings = []
 
 class TestHelper(unittest.TestCase):
+	# object with begin() and rollback() run around each helper invocation
+	# e.g. SQLiteSavepointIsolation, or None to leave cleanup to the suite
+	isolation = None
+	# time every data layer callable passed to the helpers and report
+	# percentiles per helper and filter field at the end of the run
+	instrument = bool(os.environ.get('TESTHELPER_INSTRUMENT'))
+	# p95 milliseconds per callable parameter name, e.g. {'get': 1}, or per
+	# helper name for that helper's search calls, e.g. {'search_by_id': 5},
+	# checked at the end of each helper invocation
+	latency_budgets = None
+	# directory to write a cProfile .pstats file per helper name to at the
+	# end of the run, or None to not profile
+	# AsyncTestHelper only profiles the helper body in its worker thread,
+	# not the data layer coroutines run on the event loop
+	profile = os.environ.get('TESTHELPER_PROFILE') or None
+	# id_bytes of rows seeded by search_scaling, excluded from result counts
+	background_ids = None
+	# bytes a search may hold at once while it runs and its results are
+	# iterated, not counting the ResultView built from them, or None to skip
+	# the check, see traced_view
+	max_iteration_memory = None
+	# StatementRecorder for the connection under test, needed by
+	# assert_max_queries and the max_queries helper arguments
+	statement_recorder = None
+	# SQLiteSnapshot restored before each search helper invocation, see
+	# seed_snapshot
+	snapshot = None
+	# set in each worker process by testhelper.runner
+	worker_id = None
+	worker_database = None
+	worker_suffix = ''
+
+	@classmethod
+	def setup_worker(cls, worker_id, database):
+		# suites open worker_database instead of a shared database, or append
+		# worker_suffix to schema names, so workers don't share rows
+		# override to create per-worker schemas up front
+		cls.worker_id = worker_id
+		cls.worker_database = database
+		cls.worker_suffix = '_' + str(worker_id)
+
+	@classmethod
+	def seed_snapshot(cls, connection, seed):
+		# seed is called once per class, e.g. from setUpClass, and the seeded
+		# database kept as the class snapshot
+		# seed may return the objects it created so their ids are known
+		# the seeded rows are only in the database while restoring helpers
+		# run, every other helper sees it as it was before seeding
+		if not cls.__dict__.get('snapshot'):
+			blank = sqlite3.connect(':memory:')
+			connection.backup(blank)
+			objects = seed()
+			connection.commit()
+			ids = None
+			if objects is not None:
+				ids = {object.id_bytes for object in objects}
+			cls.snapshot = SQLiteSnapshot(connection, ids, blank)
+			cls.snapshot.clear()
+		return cls.snapshot
+
+	@functools.cached_property
+	def id_factory(self):
+		# seeded per test so ids don't depend on test order or sharding
+		return IdFactory('{}:{}'.format(id_seed, self.id()))
+
+	def seeded_random(self, name):
+		# random generator seeded like id_factory, for generated datasets
+		return random.Random('{}:{}:{}'.format(id_seed, self.id(), name))
+
 	def assert_invalid_id_raises(self, f):
 		# id must be a base64_url string or bytes-like
 		for invalid_id in invalid_ids:
@@ -113,7 +934,298 @@ class TestHelper(unittest.TestCase):
 			with self.assertRaises(Exception):
 				f(invalid_string)
 
-	def class_create_get_and_defaults(self, class_name, create, get, defaults):
+	def assert_latency(self, f, p95_ms, warmup=10, repeat=100):
+		# f is called with no arguments, warmup times untimed and then repeat
+		# times timed, and fails if the p95 left after reject_outliers is
+		# over p95_ms
+		for i in range(warmup):
+			f()
+		result, samples = measure(f, repeat)
+		return self.check_latency(
+			getattr(f, '__name__', repr(f)),
+			samples,
+			p95_ms,
+		)
+
+	def check_latency(self, label, samples, p95_ms):
+		kept = reject_outliers(samples)
+		summary = latency_summary(kept)
+		if summary['p95'] / 1e6 > p95_ms:
+			self.fail('{} p95 {:.3f} ms over its {:.3f} ms budget\n{}'.format(
+				label,
+				summary['p95'] / 1e6,
+				p95_ms,
+				latency_table(samples, kept),
+			))
+		return summary
+
+	def check_latency_budgets(self, helper_name, samples):
+		# samples are per callable parameter name from a helper invocation
+		for key, budget in sorted(self.latency_budgets.items()):
+			operation = 'search' if helper_name == key else key
+			if samples.get(operation):
+				self.check_latency(
+					'{} {}'.format(helper_name, operation),
+					samples[operation],
+					budget,
+				)
+
+	def assert_max_queries(self, max_queries, f):
+		# f is called with no arguments and its result returned
+		recorder = self.statement_recorder
+		self.assertIsNotNone(
+			recorder,
+			'assert_max_queries needs a statement_recorder',
+		)
+		start = recorder.start()
+		try:
+			result = f()
+			queries = recorder.queries(start)
+		finally:
+			recorder.stop()
+		self.assertLessEqual(
+			len(queries),
+			max_queries,
+			'{} queries executed, expected at most {}:\n{}'.format(
+				len(queries),
+				max_queries,
+				'\n'.join(queries),
+			),
+		)
+		return result
+
+	def assert_memory_bounded(
+			self,
+			f,
+			max_growth,
+			iterations=100,
+			warmup=10,
+			top=10,
+		):
+		# f is called repeatedly and the memory it leaves allocated after
+		# warmup must stay under max_growth bytes per iteration on average
+		tracing = tracemalloc.is_tracing()
+		if not tracing:
+			tracemalloc.start()
+		try:
+			for i in range(warmup):
+				f()
+			gc.collect()
+			before = tracemalloc.take_snapshot()
+			for i in range(iterations):
+				f()
+			gc.collect()
+			after = tracemalloc.take_snapshot()
+		finally:
+			if not tracing:
+				tracemalloc.stop()
+		# allocations made by testhelper itself, e.g. timing samples, aren't
+		# retained by the data layer
+		filters = [
+			tracemalloc.Filter(False, __file__),
+			tracemalloc.Filter(False, tracemalloc.__file__),
+		]
+		stats = after.filter_traces(filters).compare_to(
+			before.filter_traces(filters),
+			'lineno',
+		)
+		growth = sum(stat.size_diff for stat in stats)
+		self.assertLessEqual(
+			growth / iterations,
+			max_growth,
+			'retained {} bytes per iteration over {} iterations, expected at'
+			' most {}, top allocation sites:\n{}'.format(
+				growth // iterations,
+				iterations,
+				max_growth,
+				'\n'.join(
+					str(stat) for stat in stats[:top] if 0 < stat.size_diff
+				),
+			),
+		)
+
+	def assert_indexed_queries(self, f):
+		# f is called with no arguments and its result returned, every query
+		# it ran on the statement_recorder's sqlite3 connection must be
+		# answered without a full table scan
+		# any SCAN of a table is a full pass, including SCAN t USING INDEX
+		# for sorting and covering index scans, so only constant rows and
+		# scans of subqueries and ctes are let through, and tables have to
+		# be looked up with a SEARCH using an index or the primary key
+		recorder = self.statement_recorder
+		self.assertTrue(
+			recorder and recorder.connection,
+			'assert_indexed_queries needs a statement_recorder on a sqlite3'
+			+ ' connection',
+		)
+		start = recorder.start()
+		try:
+			result = f()
+			queries = recorder.queries(start)
+		finally:
+			recorder.stop()
+		for statement in queries:
+			if not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+				continue
+			details = recorder.plan(statement)
+			derived = {
+				detail.split()[1] for detail in details
+				if detail.startswith(('CO-ROUTINE ', 'MATERIALIZE '))
+			}
+			scans = []
+			searches = []
+			for detail in details:
+				words = detail.split()
+				if 'SEARCH' == words[0]:
+					if 'AUTOMATIC' in words:
+						# transient indexes are built with a full scan
+						scans.append(detail)
+					elif 'USING' in words:
+						searches.append(detail)
+				elif 'SCAN' == words[0] and not (
+						'CONSTANT ROW' in detail
+						or words[1] in derived
+						or words[1] in ('SUBQUERY', 'CTE')
+						or words[1].startswith('(')
+					):
+					scans.append(detail)
+			self.assertEqual(
+				[],
+				scans,
+				'full table scan in the query plan of:\n' + statement,
+			)
+			if any(detail.startswith('SEARCH ') for detail in details):
+				self.assertTrue(
+					searches,
+					'no indexed lookup in the query plan of:\n' + statement,
+				)
+		return result
+
+	def assert_latency_budgets(self, label, summaries, p95_ms):
+		# summaries are latency_summary dicts keyed like p95_ms, keys without
+		# a budget are only reported
+		over = [
+			'{} {} p95 {:.3f} ms over {:.3f} ms'.format(
+				label,
+				key,
+				summaries[key]['p95'] / 1e6,
+				budget,
+			)
+			for key, budget in sorted((p95_ms or {}).items())
+			if key in summaries and summaries[key]['p95'] / 1e6 > budget
+		]
+		if over:
+			self.fail('\n'.join(over))
+
+	def index_checked(self, f):
+		# wraps a callable so that every call is held to assert_indexed_queries
+		# searches are passed through indexed first so that lazily yielded
+		# results are fetched inside the check
+		def wrapper(*args, **kwargs):
+			return self.assert_indexed_queries(lambda: f(*args, **kwargs))
+		return wrapper
+
+	def query_budget(self, f, max_queries):
+		# wraps a callable so that every call is held to max_queries
+		# searches are passed through indexed first, see index_checked
+		def wrapper(*args, **kwargs):
+			return self.assert_max_queries(
+				max_queries,
+				lambda: f(*args, **kwargs),
+			)
+		return wrapper
+
+	def indexed(self, search, keep=0):
+		# wraps a search callable so its results are ResultViews
+		def wrapper(*args, **kwargs):
+			if self.max_iteration_memory is None:
+				return self.view(search(*args, **kwargs), keep)
+			tracing = tracemalloc.is_tracing()
+			if not tracing:
+				tracemalloc.start()
+			try:
+				objects, held = traced_view(
+					lambda: search(*args, **kwargs),
+					keep,
+				)
+			finally:
+				if not tracing:
+					tracemalloc.stop()
+			self.assertLessEqual(
+				held,
+				self.max_iteration_memory,
+				'search held {} bytes while iterating, expected at most {}'.format(
+					held,
+					self.max_iteration_memory,
+				),
+			)
+			return objects
+		return wrapper
+
+	def view(self, objects, keep=0):
+		if isinstance(objects, ResultView):
+			return objects
+		return ResultView(objects, keep)
+
+	def seed(self, create, create_many, kwargs_list):
+		# seed with a single bulk call when create_many is given, otherwise
+		# one create per object
+		if create_many:
+			return list(create_many(kwargs_list))
+		return [create(**kwargs) for kwargs in kwargs_list]
+
+	def seed_ids(self, create, create_many, kwargs_list, chunk=10000):
+		# seeds generated rows with ids from id_factory so that the rows can
+		# be recognized in results without keeping the created objects
+		ids = self.id_factory.ids(len(kwargs_list))
+		for start in range(0, len(kwargs_list), chunk):
+			self.seed(
+				create,
+				create_many,
+				[
+					dict(kwargs, id=id_bytes)
+					for (id_bytes, id), kwargs in zip(
+						ids[start:start + chunk],
+						kwargs_list[start:start + chunk],
+					)
+				],
+			)
+		return [id_bytes for id_bytes, id in ids]
+
+	def seeded_results(self, objects, ids):
+		# id_bytes of a result view that belong to ids
+		self.assertIsNotNone(
+			objects.ids,
+			'generated dataset helpers need search results of objects with'
+			+ ' id_bytes',
+		)
+		return objects.ids & ids
+
+	def result_count(self, objects):
+		# while search_scaling has background rows seeded only the objects
+		# seeded by the helper itself are counted
+		if self.background_ids is None:
+			return len(objects)
+		if isinstance(objects, ResultView) and objects.ids is not None:
+			return len(objects.ids.difference(self.background_ids))
+		count = 0
+		for object in result_objects(objects):
+			if object.id_bytes not in self.background_ids:
+				count += 1
+		return count
+
+	@helper
+	def class_create_get_and_defaults(
+			self,
+			class_name,
+			create,
+			get,
+			defaults,
+			max_queries=None,
+			max_memory_growth=None,
+		):
+		if max_queries is not None:
+			get = self.query_budget(get, max_queries)
 		# instantiate directly
 		instance = class_name()
 		# create in db
@@ -135,10 +1247,17 @@ class TestHelper(unittest.TestCase):
 			self.assertEqual(value, getattr(instance, property))
 			self.assertEqual(value, getattr(object, property))
 
+		if max_memory_growth is not None:
+			self.assert_memory_bounded(
+				lambda: get(object.id),
+				max_memory_growth,
+			)
+
+	@helper
 	def id_property(self, class_name, create, property):
+		ids = self.id_factory.ids(2)
 		# id can be specified from bytes-like
-		expected_id_bytes = uuid.uuid4().bytes
-		expected_id = base64_url_encode(expected_id_bytes)
+		expected_id_bytes, expected_id = ids[0]
 		# instantiate directly
 		instance = class_name(**{property: expected_id_bytes})
 		instance_id_bytes = getattr(instance, property + '_bytes')
@@ -153,8 +1272,7 @@ class TestHelper(unittest.TestCase):
 		self.assertEqual(expected_id, object_id)
 
 		# id can be specified from a base64_url string
-		expected_id_bytes = uuid.uuid4().bytes
-		expected_id = base64_url_encode(expected_id_bytes)
+		expected_id_bytes, expected_id = ids[1]
 		# instantiate directly
 		instance = class_name(**{property: expected_id})
 		instance_id_bytes = getattr(instance, property + '_bytes')
@@ -175,6 +1293,7 @@ class TestHelper(unittest.TestCase):
 			lambda input: create(**{property: input})
 		)
 
+	@helper
 	def int_property(self, class_name, create, property):
 		for valid_int in valid_ints:
 			# int properties first cast to int
@@ -200,6 +1319,7 @@ class TestHelper(unittest.TestCase):
 			lambda input: create(**{property: input})
 		)
 
+	@helper
 	def time_property(self, class_name, create, property):
 		for valid_timestamp in [
 				# valid int
@@ -246,6 +1366,7 @@ class TestHelper(unittest.TestCase):
 			lambda input: create(**{property + '_time': input})
 		)
 
+	@helper
 	def bool_property(self, class_name, create, property):
 		# bool properties are evaluated to truthy or falsy, so there aren't
 		# any invalid inputs, just what they're interpreted as
@@ -278,6 +1399,7 @@ class TestHelper(unittest.TestCase):
 			object = create(**{property: falsy_input})
 			self.assertEqual(False, getattr(object, property))
 
+	@helper
 	def string_property(self, class_name, create, property):
 		for valid_string in [
 				# valid string
@@ -313,6 +1435,7 @@ class TestHelper(unittest.TestCase):
 			lambda input: create(**{property: input})
 		)
 
+	@helper
 	def delete(self, create, get, delete):
 		# by id
 		object = create()
@@ -327,6 +1450,74 @@ class TestHelper(unittest.TestCase):
 
 		self.assert_invalid_id_raises(delete)
 
+	@helper
+	def cache_coherence(
+			self,
+			create,
+			get,
+			delete,
+			update=None,
+			cache_stats=None,
+			min_hit_rate=0.9,
+			repeat=10,
+		):
+		# update is called with an object's id and returns the changed object
+		# cache_stats returns hits and misses as attributes or keys, e.g. the
+		# cache_info of a functools.lru_cache
+		def stats():
+			info = cache_stats()
+			if isinstance(info, dict):
+				return info['hits'], info['misses']
+			return info.hits, info.misses
+
+		object = create()
+		# fill the cache under both keys
+		self.assertIsNotNone(get(object.id))
+		self.assertIsNotNone(get(object.id_bytes))
+
+		if update:
+			updated = update(object.id)
+			self.assertFalse(
+				compare_base_attributes(object, updated),
+				'update should change at least one property',
+			)
+			# read after update
+			self.assertTrue(compare_base_attributes(updated, get(object.id)))
+			self.assertTrue(
+				compare_base_attributes(updated, get(object.id_bytes))
+			)
+
+		if cache_stats:
+			hits, misses = stats()
+			for i in range(repeat):
+				get(object.id)
+				get(object.id_bytes)
+			after_hits, after_misses = stats()
+			hits = after_hits - hits
+			misses = after_misses - misses
+			self.assertGreaterEqual(
+				hits / max(1, hits + misses),
+				min_hit_rate,
+				'{} hits and {} misses over {} repeated gets'.format(
+					hits,
+					misses,
+					2 * repeat,
+				),
+			)
+
+		# read after delete by id
+		delete(object.id)
+		self.assertIsNone(get(object.id))
+		self.assertIsNone(get(object.id_bytes))
+		# read after delete by id_bytes
+		object = create()
+		self.assertIsNotNone(get(object.id))
+		self.assertIsNotNone(get(object.id_bytes))
+		delete(object.id_bytes)
+		self.assertIsNone(get(object.id))
+		self.assertIsNone(get(object.id_bytes))
+
+	@helper
 	def id_collision(self, create):
 		object = create()
 		# by id
@@ -336,29 +1527,169 @@ class TestHelper(unittest.TestCase):
 		with self.assertRaises(Exception):
 			create(id=object.id_bytes)
 
-	def count(self, create, count, delete):
+	@helper
+	def id_collision_concurrent(self, create, threads=8, ids=100, timeout=10):
+		# fires threads concurrent creates with the same id, for each of ids
+		# ids, and asserts that exactly one of each round succeeds
+		barrier = threading.Barrier(threads, timeout=timeout)
+
+		def attempt(id):
+			# line every thread up so the creates actually race
+			barrier.wait()
+			start = time.perf_counter_ns()
+			try:
+				create(id=id)
+				succeeded = True
+			except Exception:
+				succeeded = False
+			return succeeded, time.perf_counter_ns() - start
+
+		latencies = []
+		start = time.perf_counter()
+		with ThreadPoolExecutor(threads) as executor:
+			for id_bytes, id in self.id_factory.ids(ids):
+				results = list(executor.map(attempt, [id] * threads))
+				successes = sum(succeeded for succeeded, latency in results)
+				self.assertEqual(
+					1,
+					successes,
+					'{} of {} concurrent creates with id {} succeeded'.format(
+						successes,
+						threads,
+						id,
+					),
+				)
+				latencies += [latency for succeeded, latency in results]
+		elapsed = time.perf_counter() - start
+		# create latency under contention includes any time spent waiting on
+		# the data layer's locks
+		summary = report_latency('id_collision_concurrent create', latencies)
+		summary['throughput'] = len(latencies) / elapsed
+		sys.stderr.write(
+			'id_collision_concurrent: {:.1f} creates/s over {} threads\n'.format(
+				summary['throughput'],
+				threads,
+			)
+		)
+		return summary
+
+	@helper
+	def count(
+			self,
+			create,
+			count,
+			delete,
+			max_queries=None,
+			max_memory_growth=None,
+		):
+		if max_queries is not None:
+			count = self.query_budget(count, max_queries)
+		# rows already in the database are counted too
+		baseline = count()
 		object1 = create()
 		object2 = create()
-		self.assertEqual(2, count())
+		self.assertEqual(baseline + 2, count())
+		if max_memory_growth is not None:
+			self.assert_memory_bounded(count, max_memory_growth)
 
 		delete(object2.id)
-		self.assertEqual(1, count())
+		self.assertEqual(baseline + 1, count())
 
 		object3 = create()
-		self.assertEqual(2, count())
+		self.assertEqual(baseline + 2, count())
 
 		delete(object3.id)
-		self.assertEqual(1, count())
+		self.assertEqual(baseline + 1, count())
 
 		delete(object1.id)
-		self.assertEqual(0, count())
+		self.assertEqual(baseline, count())
 
-	def search(self, create, search, delete):
-		object1 = create()
-		object2 = create()
+	@helper
+	def count_concurrent(
+			self,
+			create,
+			count,
+			delete,
+			writers=4,
+			readers=4,
+			operations=100,
+			rounds=5,
+		):
+		# writers interleave creates and deletes of their own objects while
+		# readers call count, so readers must never see fewer objects than
+		# there were before the round or more than could have been created
+		reader_latencies = []
+		for i in range(rounds):
+			baseline = count()
+			ceiling = baseline + writers * operations
+			writing = threading.Event()
+			writing.set()
+			impossible = []
+
+			def write():
+				created = []
+				creates = 0
+				deletes = 0
+				for operation in range(operations):
+					created.append(create())
+					creates += 1
+					if operation % 2:
+						delete(created.pop(0).id)
+						deletes += 1
+				return creates - deletes
+
+			def read():
+				latencies = []
+				while writing.is_set():
+					start = time.perf_counter_ns()
+					value = count()
+					latencies.append(time.perf_counter_ns() - start)
+					if not baseline <= value <= ceiling:
+						impossible.append(value)
+				return latencies
+
+			with ThreadPoolExecutor(writers + readers) as executor:
+				reading = [executor.submit(read) for i in range(readers)]
+				writing_futures = [
+					executor.submit(write) for i in range(writers)
+				]
+				try:
+					difference = sum(
+						future.result() for future in writing_futures
+					)
+				finally:
+					writing.clear()
+				for future in reading:
+					reader_latencies += future.result()
+
+			self.assertEqual(
+				[],
+				impossible,
+				'readers saw counts outside {} to {}'.format(baseline, ceiling),
+			)
+			# writers are done so the count has to be exact again
+			self.assertEqual(baseline + difference, count())
+		return report_latency('count_concurrent count', reader_latencies)
+
+	@helper(restores=True)
+	def search(
+			self,
+			create,
+			search,
+			delete,
+			create_many=None,
+			max_queries=None,
+			max_memory_growth=None,
+		):
+		if max_queries is not None:
+			search = self.query_budget(self.indexed(search), max_queries)
+		search = self.indexed(search)
+		object1, object2 = self.seed(create, create_many, [{}, {}])
 		objects = search()
 		self.assertTrue(object1 in objects)
 		self.assertTrue(object2 in objects)
+		if max_memory_growth is not None:
+			self.assert_memory_bounded(search, max_memory_growth)
 
 		delete(object2.id)
 		objects = search()
@@ -383,6 +1714,7 @@ class TestHelper(unittest.TestCase):
 		self.assertTrue(object2 not in objects)
 		self.assertTrue(object3 not in objects)
 
+	@helper
 	def search_sort_order_and_pagination(
 			self,
 			create,
@@ -391,10 +1723,18 @@ class TestHelper(unittest.TestCase):
 			first_value=1,
 			middle_value=2,
 			last_value=3,
+			create_many=None,
 		):
-		object_first = create(**{column_field: first_value})
-		object_middle = create(**{column_field: middle_value})
-		object_last = create(**{column_field: last_value})
+		search = self.indexed(search, keep=3)
+		object_first, object_middle, object_last = self.seed(
+			create,
+			create_many,
+			[
+				{column_field: first_value},
+				{column_field: middle_value},
+				{column_field: last_value},
+			],
+		)
 
 		# ascending
 		ascending_objects = [
@@ -403,13 +1743,12 @@ class TestHelper(unittest.TestCase):
 			object_last,
 		]
 		objects = search(sort=column_field, order='asc')
-		for object in ascending_objects:
-			self.assertTrue(
-				compare_base_attributes(
-					object,
-					objects.values()[ascending_objects.index(object)],
-				)
+		self.assertTrue(
+			compare_base_attributes_batch(
+				ascending_objects,
+				objects.values()[:len(ascending_objects)],
 			)
+		)
 		for page in range(4):
 			objects = search(sort=column_field, order='asc', perpage=1, page=page)
 			for object in ascending_objects:
@@ -425,13 +1764,12 @@ class TestHelper(unittest.TestCase):
 			object_first,
 		]
 		objects = search(sort=column_field, order='desc')
-		for object in descending_objects:
-			self.assertTrue(
-				compare_base_attributes(
-					object,
-					objects.values()[descending_objects.index(object)],
-				)
+		self.assertTrue(
+			compare_base_attributes_batch(
+				descending_objects,
+				objects.values()[:len(descending_objects)],
 			)
+		)
 		for page in range(4):
 			objects = search(sort=column_field, order='desc', perpage=1, page=page)
 			for object in descending_objects:
@@ -440,6 +1778,104 @@ class TestHelper(unittest.TestCase):
 				else:
 					self.assertTrue(object in objects)
 
+	@helper
+	def search_deep_pagination(
+			self,
+			create,
+			column_field,
+			search,
+			rows=10000,
+			perpage=100,
+			max_ratio=3,
+			repeat=5,
+			value=None,
+			create_many=None,
+			search_after=None,
+		):
+		# seeds rows with ascending column values and times the first, middle,
+		# and last pages, late pages that are much slower than the first one
+		# usually mean OFFSET pagination
+		# value(i) must sort in the same order as i
+		if not value:
+			value = lambda i: i
+		seeded = self.seed(
+			create,
+			create_many,
+			[{column_field: value(i)} for i in range(rows)],
+		)
+		pages = math.ceil(rows / perpage)
+		latencies = {}
+		for page in sorted({0, pages // 2, pages - 1}):
+			# results are listed while timing so lazily yielded pages
+			# are measured too
+			objects, samples = measure(
+				lambda: list(result_objects(search(
+					sort=column_field,
+					order='asc',
+					perpage=perpage,
+					page=page,
+				))),
+				repeat,
+			)
+			self.assertTrue(
+				compare_base_attributes_batch(
+					seeded[page * perpage:(page + 1) * perpage],
+					objects,
+				),
+				'page {} of {} has the wrong objects'.format(page, pages),
+			)
+			latencies[page] = percentile(samples, 50)
+		for page in latencies:
+			ratio = latencies[page] / max(1, latencies[0])
+			self.assertLessEqual(
+				ratio,
+				max_ratio,
+				'page {} of {} took {:.1f}x as long as the first page'.format(
+					page,
+					pages,
+					ratio,
+				),
+			)
+
+		if search_after:
+			# cursor pagination is walked from the start, passing the last
+			# object of each page as after
+			samples = []
+			after = None
+			for page in range(pages):
+				start = time.perf_counter_ns()
+				objects = list(result_objects(search_after(
+					after=after,
+					sort=column_field,
+					order='asc',
+					perpage=perpage,
+				)))
+				samples.append(time.perf_counter_ns() - start)
+				self.assertTrue(
+					compare_base_attributes_batch(
+						seeded[page * perpage:(page + 1) * perpage],
+						objects,
+					),
+					'cursor page {} of {} has the wrong objects'.format(
+						page,
+						pages,
+					),
+				)
+				after = objects[-1]
+			window = max(1, pages // 10)
+			early = sorted(samples[:window])
+			late = sorted(samples[-window:])
+			ratio = percentile(late, 50) / max(1, percentile(early, 50))
+			self.assertLessEqual(
+				ratio,
+				max_ratio,
+				'late cursor pages took {:.1f}x as long as early ones'.format(
+					ratio,
+				),
+			)
+		return latencies
+
+	@helper(restores=True)
 	def search_by_id(
 			self,
 			create,
@@ -448,14 +1884,23 @@ class TestHelper(unittest.TestCase):
 			filter_field,
 			id1=None,
 			id2=None,
+			create_many=None,
+			expect_index=False,
 		):
+		if expect_index:
+			search = self.index_checked(self.indexed(search))
+		search = self.indexed(search)
+		ids = self.id_factory.ids(2)
 		if not id1:
-			id1 = base64_url_encode(uuid.uuid4().bytes)
+			id1 = ids[0][1]
 		if not id2:
-			id2 = base64_url_encode(uuid.uuid4().bytes)
+			id2 = ids[1][1]
 
-		object1 = create(**{column_field: id1})
-		object2 = create(**{column_field: id2})
+		object1, object2 = self.seed(
+			create,
+			create_many,
+			[{column_field: id1}, {column_field: id2}],
+		)
 
 		objects = search(
 			filter={filter_field: id1}
@@ -491,11 +1936,12 @@ class TestHelper(unittest.TestCase):
 			self.assertTrue(object2 not in objects)
 		# for safety a filter with only invalid values should return no results
 		objects = search(filter={filter_field: invalid_ids})
-		self.assertEqual(0, len(objects))
+		self.assertEqual(0, self.result_count(objects))
 		for invalid_id in invalid_ids:
 			objects = search(filter={filter_field: invalid_id})
-			self.assertEqual(0, len(objects))
+			self.assertEqual(0, self.result_count(objects))
 
+	@helper(restores=True)
 	def search_by_int_cutoff(
 			self,
 			create,
@@ -507,15 +1953,26 @@ class TestHelper(unittest.TestCase):
 			middle_value=1,
 			last_value=2,
 			invalid_values=invalid_ints,
+			create_many=None,
+			expect_index=False,
 		):
-		object_first = create(**{column_field: first_value})
-		object_middle = create(**{column_field: middle_value})
-		object_last = create(**{column_field: last_value})
+		if expect_index:
+			search = self.index_checked(self.indexed(search))
+		search = self.indexed(search)
+		object_first, object_middle, object_last = self.seed(
+			create,
+			create_many,
+			[
+				{column_field: first_value},
+				{column_field: middle_value},
+				{column_field: last_value},
+			],
+		)
 
 		objects = search(
 			filter={filter_field_less_than: last_value}
 		)
-		self.assertEqual(2, len(objects))
+		self.assertEqual(2, self.result_count(objects))
 		self.assertTrue(object_first in objects)
 		self.assertTrue(object_middle in objects)
 		self.assertTrue(object_last not in objects)
@@ -523,16 +1980,16 @@ class TestHelper(unittest.TestCase):
 		objects = search(
 			filter={filter_field_less_than: middle_value}
 		)
-		self.assertEqual(1, len(objects))
+		self.assertEqual(1, self.result_count(objects))
 		self.assertTrue(object_first in objects)
 		self.assertTrue(object_middle not in objects)
 		self.assertTrue(object_last not in objects)
 
 		objects = search(filter={filter_field_less_than: first_value})
-		self.assertEqual(0, len(objects))
+		self.assertEqual(0, self.result_count(objects))
 
 		objects = search(filter={filter_field_greater_than: first_value})
-		self.assertEqual(2, len(objects))
+		self.assertEqual(2, self.result_count(objects))
 		self.assertTrue(object_first not in objects)
 		self.assertTrue(object_middle in objects)
 		self.assertTrue(object_last in objects)
@@ -540,7 +1997,7 @@ class TestHelper(unittest.TestCase):
 		objects = search(
 			filter={filter_field_greater_than: middle_value}
 		)
-		self.assertEqual(1, len(objects))
+		self.assertEqual(1, self.result_count(objects))
 		self.assertTrue(object_first not in objects)
 		self.assertTrue(object_middle not in objects)
 		self.assertTrue(object_last in objects)
@@ -548,7 +2005,7 @@ class TestHelper(unittest.TestCase):
 		objects = search(
 			filter={filter_field_greater_than: last_value}
 		)
-		self.assertEqual(0, len(objects))
+		self.assertEqual(0, self.result_count(objects))
 
 		objects = search(
 			filter={
@@ -556,7 +2013,7 @@ class TestHelper(unittest.TestCase):
 				filter_field_less_than: last_value,
 			}
 		)
-		self.assertEqual(1, len(objects))
+		self.assertEqual(1, self.result_count(objects))
 		self.assertTrue(object_first not in objects)
 		self.assertTrue(object_middle in objects)
 		self.assertTrue(object_last not in objects)
@@ -565,16 +2022,19 @@ class TestHelper(unittest.TestCase):
 		# so invalid values return no results
 		for invalid_value in invalid_values:
 			objects = search(filter={filter_field_greater_than: invalid_value})
-			self.assertEqual(0, len(objects))
+			self.assertEqual(0, self.result_count(objects))
 			objects = search(filter={filter_field_less_than: invalid_value})
-			self.assertEqual(0, len(objects))
+			self.assertEqual(0, self.result_count(objects))
 
+	@helper(restores=True)
 	def search_by_time_cutoff(
 			self,
 			create,
 			column_field,
 			search,
 			filter_field,
+			create_many=None,
+			expect_index=False,
 		):
 		self.search_by_int_cutoff(
 			create,
@@ -583,18 +2043,29 @@ class TestHelper(unittest.TestCase):
 			filter_field + '_before',
 			filter_field + '_after',
 			invalid_values=invalid_timestamps,
+			create_many=create_many,
+			expect_index=expect_index,
 		)
 
+	@helper(restores=True)
 	def search_by_string_like(
 			self,
 			create,
 			column_field,
 			search,
 			filter_field,
+			create_many=None,
 		):
-		object_foo = create(**{column_field: 'foo'})
-		object_bar = create(**{column_field: 'bar'})
-		object_baz = create(**{column_field: 'baz'})
+		search = self.indexed(search)
+		object_foo, object_bar, object_baz = self.seed(
+			create,
+			create_many,
+			[
+				{column_field: 'foo'},
+				{column_field: 'bar'},
+				{column_field: 'baz'},
+			],
+		)
 
 		objects = search(filter={filter_field: 'foo'})
 		self.assertTrue(object_foo in objects)
@@ -628,16 +2099,25 @@ class TestHelper(unittest.TestCase):
 		# should always be valid
 		pass
 
+	@helper(restores=True)
 	def search_by_string_not_like(
 			self,
 			create,
 			column_field,
 			search,
 			filter_field,
+			create_many=None,
 		):
-		object_foo = create(**{column_field: 'foo'})
-		object_bar = create(**{column_field: 'bar'})
-		object_baz = create(**{column_field: 'baz'})
+		search = self.indexed(search)
+		object_foo, object_bar, object_baz = self.seed(
+			create,
+			create_many,
+			[
+				{column_field: 'foo'},
+				{column_field: 'bar'},
+				{column_field: 'baz'},
+			],
+		)
 
 		objects = search(filter={filter_field: 'foo'})
 		self.assertTrue(object_foo not in objects)
@@ -682,16 +2162,28 @@ class TestHelper(unittest.TestCase):
 		# should always be valid
 		pass
 
+	@helper(restores=True)
 	def search_by_string_equal(
 			self,
 			create,
 			column_field,
 			search,
 			filter_field,
+			create_many=None,
+			expect_index=False,
 		):
-		object_foo = create(**{column_field: 'foo'})
-		object_bar = create(**{column_field: 'bar'})
-		object_baz = create(**{column_field: 'baz'})
+		if expect_index:
+			search = self.index_checked(self.indexed(search))
+		search = self.indexed(search)
+		object_foo, object_bar, object_baz = self.seed(
+			create,
+			create_many,
+			[
+				{column_field: 'foo'},
+				{column_field: 'bar'},
+				{column_field: 'baz'},
+			],
+		)
 
 		objects = search(filter={filter_field: 'foo'})
 		self.assertTrue(object_foo in objects)
@@ -709,7 +2201,7 @@ class TestHelper(unittest.TestCase):
 		self.assertTrue(object_baz in objects)
 
 		objects = search(filter={filter_field: 'bat'})
-		self.assertEqual(0, len(objects))
+		self.assertEqual(0, self.result_count(objects))
 
 		objects = search(filter={filter_field: ['foo', 'bar']})
 		self.assertTrue(object_foo in objects)
@@ -723,16 +2215,25 @@ class TestHelper(unittest.TestCase):
 		# should always be valid
 		pass
 
+	@helper(restores=True)
 	def search_by_string_not_equal(
 			self,
 			create,
 			column_field,
 			search,
 			filter_field,
+			create_many=None,
 		):
-		object_foo = create(**{column_field: 'foo'})
-		object_bar = create(**{column_field: 'bar'})
-		object_baz = create(**{column_field: 'baz'})
+		search = self.indexed(search)
+		object_foo, object_bar, object_baz = self.seed(
+			create,
+			create_many,
+			[
+				{column_field: 'foo'},
+				{column_field: 'bar'},
+				{column_field: 'baz'},
+			],
+		)
 
 		objects = search(filter={filter_field: 'foo'})
 		self.assertTrue(object_foo not in objects)
@@ -777,9 +2278,24 @@ class TestHelper(unittest.TestCase):
 		# should always be valid
 		pass
 
-	def search_by_bool(self, create, column_field, search, filter_field):
-		object_true = create(**{column_field: 1})
-		object_false = create(**{column_field: 0})
+	@helper(restores=True)
+	def search_by_bool(
+			self,
+			create,
+			column_field,
+			search,
+			filter_field,
+			create_many=None,
+			expect_index=False,
+		):
+		if expect_index:
+			search = self.index_checked(self.indexed(search))
+		search = self.indexed(search)
+		object_true, object_false = self.seed(
+			create,
+			create_many,
+			[{column_field: 1}, {column_field: 0}],
+		)
 
 		objects = search(filter={filter_field: True})
 		self.assertTrue(object_true in objects)
@@ -800,18 +2316,73 @@ class TestHelper(unittest.TestCase):
 			self.assertTrue(object_true not in objects)
 			self.assertTrue(object_false in objects)
 
+	@helper(restores=True)
 	def search_by_remote_origin(
 			self,
 			create,
 			column_field,
 			search,
 			filter_field,
+			create_many=None,
+			ipv6=False,
+			cidr=False,
 		):
+		search = self.indexed(search)
 		remote_origin1 = '1.1.1.1'
 		remote_origin2 = '2.2.2.2'
-		object1 = create(**{column_field: remote_origin1})
-		object2 = create(**{column_field: remote_origin1})
-		object3 = create(**{column_field: remote_origin2})
+		object1, object2, object3 = self.seed(
+			create,
+			create_many,
+			[
+				{column_field: remote_origin1},
+				{column_field: remote_origin1},
+				{column_field: remote_origin2},
+			],
+		)
+
+		if ipv6 or cidr:
+			remote_origin4 = '2001:db8::1'
+			remote_origin5 = '2001:db8:1::1'
+			object4, object5 = self.seed(
+				create,
+				create_many,
+				[
+					{column_field: remote_origin4},
+					{column_field: remote_origin5},
+				],
+			)
+			seeded = [object1, object2, object3, object4, object5]
+			cases = []
+			if ipv6:
+				cases += [
+					(remote_origin4, [object4]),
+					(remote_origin5, [object5]),
+					([remote_origin1, remote_origin4], [object1, object2, object4]),
+				]
+			if cidr:
+				# networks match every address they contain, and only
+				# addresses of their own version
+				cases += [
+					('1.1.1.0/24', [object1, object2]),
+					('0.0.0.0/0', [object1, object2, object3]),
+					('2001:db8::/48', [object4]),
+					('2001:db8::/32', [object4, object5]),
+					(
+						['1.1.1.0/24', '2001:db8:1::/48'],
+						[object1, object2, object5],
+					),
+				]
+			for filter_prefix, assert_ in [
+					('with_', self.assertTrue),
+					('without_', self.assertFalse),
+				]:
+				for value, expected in cases:
+					objects = search(filter={filter_prefix + filter_field: value})
+					for object in seeded:
+						if any(object is match for match in expected):
+							assert_(object in objects)
+						else:
+							assert_(object not in objects)
 
 		for filter_prefix, assert_ in [
 				('with_', self.assertTrue),
@@ -846,12 +2417,12 @@ class TestHelper(unittest.TestCase):
 			objects = search(
 				filter={filter_prefix + filter_field: invalid_remote_origins},
 			)
-			self.assertEqual(0, len(objects))
+			self.assertEqual(0, self.result_count(objects))
 			for invalid_value in invalid_remote_origins:
 				objects = search(
 					filter={filter_prefix + filter_field: invalid_value},
 				)
-				self.assertEqual(0, len(objects))
+				self.assertEqual(0, self.result_count(objects))
 
 		# with
 		# invalid filter exceptions are aborted by the statement helper
@@ -897,7 +2468,9 @@ class TestHelper(unittest.TestCase):
 			self.assertTrue(object2 not in objects)
 			self.assertTrue(object3 in objects)
 
-	def search_by_group_bits(self, create, search):
+	@helper(restores=True)
+	def search_by_group_bits(self, create, search, create_many=None):
+		search = self.indexed(search)
 		group1_bit = 1
 		group2_bit = 2
 		group3_bit = 4
@@ -905,15 +2478,22 @@ class TestHelper(unittest.TestCase):
 		group1_and_group3_bits = 5
 		group2_and_group3_bits = 6
 
-		object_group1 = create(group_bits=group1_bit)
-		object_group2 = create(group_bits=group2_bit)
-		object_group3 = create(group_bits=group3_bit)
-
-		object_group1_and_group3 = create(
-			group_bits=group1_and_group3_bits,
-		)
-		object_group2_and_group3 = create(
-			group_bits=group2_and_group3_bits,
+		(
+			object_group1,
+			object_group2,
+			object_group3,
+			object_group1_and_group3,
+			object_group2_and_group3,
+		) = self.seed(
+			create,
+			create_many,
+			[
+				{'group_bits': group1_bit},
+				{'group_bits': group2_bit},
+				{'group_bits': group3_bit},
+				{'group_bits': group1_and_group3_bits},
+				{'group_bits': group2_and_group3_bits},
+			],
 		)
 
 		for filter_prefix, assert_ in [
@@ -952,7 +2532,7 @@ class TestHelper(unittest.TestCase):
 		# so invalid values return no results
 		for invalid_value in invalid_group_bits:
 			objects = search(filter={'with_group_bits': invalid_value})
-			self.assertEqual(0, len(objects))
+			self.assertEqual(0, self.result_count(objects))
 			self.assertTrue(object_group1 not in objects)
 			self.assertTrue(object_group2 not in objects)
 			self.assertTrue(object_group3 not in objects)
@@ -962,17 +2542,745 @@ class TestHelper(unittest.TestCase):
 		# for safety a filter with only invalid values should return no results
 		for invalid_value in invalid_group_bits:
 			objects = search(filter={'with_group_bits': invalid_value})
-			self.assertEqual(0, len(objects))
+			self.assertEqual(0, self.result_count(objects))
 
 		# invalid filter exceptions are consumed by the statement
 		# helper, so invalid values are ignored
 		for invalid_value in invalid_group_bits:
 			objects = search(filter={'without_group_bits': invalid_value})
-			self.assertEqual(5, len(objects))
+			self.assertEqual(5, self.result_count(objects))
 			self.assertTrue(object_group1 in objects)
 			self.assertTrue(object_group2 in objects)
 			self.assertTrue(object_group3 in objects)
 			self.assertTrue(object_group1_and_group3 in objects)
 			self.assertTrue(object_group2_and_group3 in objects)
 
+	@helper
+	def search_scaling(
+			self,
+			helper,
+			sizes=(1000, 10000, 100000),
+			complexity='log',
+			tolerance=4,
+			background=None,
+			**kwargs
+		):
+		# reruns a search_by_* helper with kwargs over increasing numbers of
+		# background rows and fails if the median search latency grows faster
+		# than the declared complexity class allows
+		# e.g. search_scaling(self.search_by_id, complexity='log', create=...,
+		# column_field=..., search=..., filter_field=...)
+		create = kwargs['create']
+		search = kwargs['search']
+		create_many = kwargs.get('create_many')
+		if not background:
+			background = lambda i: {}
+		growth = complexity_classes[complexity]
+		latencies = {}
+		seeded = 0
+		background_ids = set()
+		for size in sorted(sizes):
+			created = self.seed(
+				create,
+				create_many,
+				[background(i) for i in range(seeded, size)],
+			)
+			seeded = size
+			background_ids.update(object.id_bytes for object in created)
+			# rows left over from earlier runs count as background too
+			background_ids.update(
+				object.id_bytes for object in result_objects(search())
+			)
 
+			samples = []
+			indexed_search = self.indexed(search)
+			def timed_search(*args, **kwargs):
+				# results are indexed while timing so lazily yielded results
+				# are measured too
+				# only searches returning seeded rows are kept, invalid filters
+				# are aborted without touching the table and would dilute the
+				# median with constant time calls
+				start = time.perf_counter_ns()
+				objects = indexed_search(*args, **kwargs)
+				elapsed = time.perf_counter_ns() - start
+				if self.result_count(objects):
+					samples.append(elapsed)
+				return objects
+			self.background_ids = background_ids
+			try:
+				helper(**dict(kwargs, search=timed_search))
+			finally:
+				self.background_ids = None
+			self.assertTrue(
+				samples,
+				'{} made no searches returning seeded rows'.format(
+					helper.__name__,
+				),
+			)
+			samples.sort()
+			latencies[size] = percentile(samples, 50)
+
+		smallest = min(latencies)
+		largest = max(latencies)
+		if smallest != largest:
+			allowed = tolerance * growth(largest) / growth(smallest)
+			ratio = latencies[largest] / max(1, latencies[smallest])
+			self.assertLessEqual(
+				ratio,
+				allowed,
+				'{} median search latency grew {:.1f}x from {} to {} rows,'
+				' {} growth allows {:.1f}x'.format(
+					helper.__name__,
+					ratio,
+					smallest,
+					largest,
+					complexity,
+					allowed,
+				),
+			)
+		return latencies
+
+	@helper(restores=True)
+	def search_by_group_bits_scaled(
+			self,
+			create,
+			search,
+			rows=100000,
+			bits=63,
+			row_bits=3,
+			query_bits=3,
+			queries=50,
+			match='any',
+			create_many=None,
+		):
+		# seeds rows with random masks of up to row_bits of bits groups and
+		# checks random multi bit with_ and without_ group_bits queries
+		# against a bitwise and oracle
+		# match is how a multi bit query applies, 'any' matches rows in any
+		# of the query's groups, 'all' only rows in every one of them
+		generator = self.seeded_random('group_bits')
+		masks = [
+			sum(
+				1 << bit for bit in generator.sample(
+					range(bits),
+					generator.randint(0, row_bits),
+				)
+			)
+			for i in range(rows)
+		]
+		ids = self.seed_ids(
+			create,
+			create_many,
+			[{'group_bits': mask} for mask in masks],
+		)
+		seeded = set(ids)
+		if numpy:
+			mask_array = numpy.array(masks, dtype=numpy.uint64)
+
+		def oracle(query):
+			# positions of the rows in query's groups
+			if numpy:
+				shared = mask_array & numpy.uint64(query)
+				if 'all' == match:
+					return numpy.flatnonzero(shared == numpy.uint64(query))
+				return numpy.flatnonzero(shared)
+			if 'all' == match:
+				return [i for i, mask in enumerate(masks) if query == mask & query]
+			return [i for i, mask in enumerate(masks) if mask & query]
+
+		search = self.indexed(search)
+		samples = {'with_': [], 'without_': []}
+		for i in range(queries):
+			query = sum(
+				1 << bit for bit in generator.sample(
+					range(bits),
+					generator.randint(1, query_bits),
+				)
+			)
+			in_groups = {ids[position] for position in oracle(query)}
+			for filter_prefix, expected in [
+					('with_', in_groups),
+					('without_', seeded - in_groups),
+				]:
+				start = time.perf_counter_ns()
+				objects = search(filter={filter_prefix + 'group_bits': query})
+				samples[filter_prefix].append(time.perf_counter_ns() - start)
+				self.assertEqual(
+					expected,
+					self.seeded_results(objects, seeded),
+					'{}group_bits {:#x} returned the wrong rows'.format(
+						filter_prefix,
+						query,
+					),
+				)
+		return {
+			filter_prefix + 'group_bits': report_latency(
+				'search_by_group_bits_scaled ' + filter_prefix + 'group_bits',
+				filter_samples,
+			)
+			for filter_prefix, filter_samples in samples.items()
+		}
+
+	@helper(restores=True)
+	def search_differential(
+			self,
+			create,
+			search,
+			fields,
+			rows=2000,
+			queries=500,
+			max_filters=3,
+			create_many=None,
+		):
+		# generates rows and random combinations of filters and compares
+		# search results against a FilterModel of the same rows
+		# fields is a list of (kind, column_field, filter_field) with kinds
+		#   'id', 'int' with a (less than, greater than) pair of filter fields,
+		#   'time' with a filter field getting _before and _after suffixes,
+		#   'string_like', 'bool', 'remote_origin' with a filter field getting
+		#   with_ and without_ prefixes, and 'group_bits' with no filter field
+		generator = self.seeded_random('differential')
+		model = FilterModel(rows)
+		id_pool = [id for id_bytes, id in self.id_factory.ids(max(2, rows // 20))]
+		words = [
+			''.join(
+				generator.choice('abcd') for i in range(generator.randint(1, 4))
+			)
+			for i in range(max(2, rows // 10))
+		]
+		remote_origins = ['10.0.0.{}'.format(i) for i in range(16)]
+		group_bits = 8
+		columns = {}
+		generators = []
+		for kind, column_field, filter_field in fields:
+			if 'id' == kind:
+				values = [generator.choice(id_pool) for i in range(rows)]
+				model.add_id(filter_field, values)
+				generators.append(lambda filter_field=filter_field: {
+					filter_field: generator.sample(
+						id_pool,
+						generator.randint(1, 3),
+					),
+				})
+			elif kind in ('int', 'time'):
+				values = [generator.randint(0, rows) for i in range(rows)]
+				if 'time' == kind:
+					filter_field = (
+						filter_field + '_before',
+						filter_field + '_after',
+					)
+				model.add_cutoff(filter_field[0], filter_field[1], values)
+				generators.append(lambda filter_field=filter_field: {
+					cutoff_field: generator.randint(-1, rows + 1)
+					for cutoff_field in generator.sample(
+						filter_field,
+						generator.randint(1, 2),
+					)
+				})
+			elif 'string_like' == kind:
+				values = [generator.choice(words) for i in range(rows)]
+				model.add_string_like(filter_field, values)
+				generators.append(lambda filter_field=filter_field: {
+					filter_field: [
+						generator.choice(words)[:generator.randint(1, 4)]
+						+ generator.choice(['', '%'])
+						for i in range(generator.randint(1, 2))
+					],
+				})
+			elif 'bool' == kind:
+				values = [generator.random() < 0.5 for i in range(rows)]
+				model.add_bool(filter_field, values)
+				generators.append(lambda filter_field=filter_field: {
+					filter_field: generator.random() < 0.5,
+				})
+			elif 'remote_origin' == kind:
+				values = [generator.choice(remote_origins) for i in range(rows)]
+				model.add_remote_origin(filter_field, values)
+				generators.append(lambda filter_field=filter_field: {
+					generator.choice(['with_', 'without_']) + filter_field: (
+						generator.sample(remote_origins, generator.randint(1, 3))
+					),
+				})
+			elif 'group_bits' == kind:
+				values = [
+					1 << generator.randrange(group_bits)
+					| 1 << generator.randrange(group_bits)
+					for i in range(rows)
+				]
+				model.add_group_bits(values, group_bits)
+				generators.append(lambda: {
+					generator.choice(['with_', 'without_']) + 'group_bits': (
+						1 << generator.randrange(group_bits)
+					),
+				})
+			else:
+				raise ValueError('unknown filter kind ' + repr(kind))
+			columns[column_field] = values
+
+		ids = self.seed_ids(
+			create,
+			create_many,
+			[
+				{
+					column_field: values[i]
+					for column_field, values in columns.items()
+				}
+				for i in range(rows)
+			],
+		)
+		seeded = set(ids)
+		search = self.indexed(search)
+		samples = []
+		for i in range(queries):
+			filter = {}
+			for generate in generator.sample(
+					generators,
+					generator.randint(1, min(max_filters, len(generators))),
+				):
+				filter.update(generate())
+			expected = {ids[position] for position in model.matches(filter)}
+			start = time.perf_counter_ns()
+			objects = search(filter=filter)
+			samples.append(time.perf_counter_ns() - start)
+			self.assertEqual(
+				expected,
+				self.seeded_results(objects, seeded),
+				'search results differ from the reference for filter '
+				+ repr(filter),
+			)
+		return report_latency('search_differential', samples)
+
+	@helper(restores=True)
+	def search_by_remote_origin_scaled(
+			self,
+			create,
+			column_field,
+			search,
+			filter_field,
+			rows=100000,
+			queries=50,
+			ipv6_share=0.25,
+			create_many=None,
+		):
+		# seeds ipv4 and ipv6 origins clustered in a few networks and checks
+		# random cidr with_ and without_ filters against ranges of sorted
+		# integer arrays
+		generator = self.seeded_random('remote_origin')
+		ipv4_networks = [
+			ipaddress.ip_network('{}.{}.0.0/16'.format(
+				generator.randint(1, 223),
+				generator.randint(0, 255),
+			))
+			for i in range(8)
+		]
+		ipv6_networks = [
+			ipaddress.ip_network('2001:db8:{:x}::/48'.format(
+				generator.randrange(1 << 16),
+			))
+			for i in range(8)
+		]
+		addresses = []
+		for i in range(rows):
+			if generator.random() < ipv6_share:
+				network = generator.choice(ipv6_networks)
+				bits = 80
+			else:
+				network = generator.choice(ipv4_networks)
+				bits = 16
+			addresses.append(
+				network.network_address + generator.getrandbits(bits)
+			)
+		ids = self.seed_ids(
+			create,
+			create_many,
+			[{column_field: str(address)} for address in addresses],
+		)
+		seeded = set(ids)
+
+		# ipv4 addresses fit packed unsigned 64 bit arrays, ipv6 ones
+		# are kept in sorted lists of python ints
+		indexes = {}
+		for version, integers in [(4, array('Q')), (6, [])]:
+			order = sorted(
+				(
+					position for position, address in enumerate(addresses)
+					if version == address.version
+				),
+				key=lambda position: int(addresses[position]),
+			)
+			integers.extend(int(addresses[position]) for position in order)
+			indexes[version] = order, integers
+
+		def oracle(network):
+			order, integers = indexes[network.version]
+			low = bisect.bisect_left(integers, int(network.network_address))
+			high = bisect.bisect_right(integers, int(network.broadcast_address))
+			return {ids[position] for position in order[low:high]}
+
+		search = self.indexed(search)
+		samples = {}
+		for i in range(queries):
+			address = generator.choice(addresses)
+			if 4 == address.version:
+				prefix = generator.randint(8, 28)
+			else:
+				prefix = generator.randint(32, 112)
+			network = ipaddress.ip_network(
+				'{}/{}'.format(address, prefix),
+				strict=False,
+			)
+			in_network = oracle(network)
+			for filter_prefix, expected in [
+					('with_', in_network),
+					('without_', seeded - in_network),
+				]:
+				start = time.perf_counter_ns()
+				objects = search(
+					filter={filter_prefix + filter_field: str(network)},
+				)
+				label = 'ipv{} {}{}'.format(
+					network.version,
+					filter_prefix,
+					filter_field,
+				)
+				samples.setdefault(label, []).append(
+					time.perf_counter_ns() - start
+				)
+				self.assertEqual(
+					expected,
+					self.seeded_results(objects, seeded),
+					'{}{} {} returned the wrong rows'.format(
+						filter_prefix,
+						filter_field,
+						network,
+					),
+				)
+		return {
+			label: report_latency(
+				'search_by_remote_origin_scaled ' + label,
+				label_samples,
+			)
+			for label, label_samples in sorted(samples.items())
+		}
+
+	@helper(restores=True)
+	def search_by_time_cutoff_scaled(
+			self,
+			create,
+			column_field,
+			search,
+			filter_field,
+			rows=1000000,
+			queries=30,
+			p95_ms=None,
+			create_many=None,
+		):
+		# seeds a year of mostly increasing times with clustered bursts and
+		# late arrivals, and checks narrow, wide and open ended _before and
+		# _after windows against bisects of the sorted times
+		# p95_ms optionally maps 'narrow', 'wide' and 'open' to budgets
+		generator = self.seeded_random('time_cutoff')
+		span = 365 * 86400
+		first = 1500000000 + generator.randrange(span)
+		bursts = [first + generator.randrange(span) for i in range(32)]
+		times = []
+		for i in range(rows):
+			if generator.random() < 0.2:
+				# bursts of activity packed into a few minutes
+				value = generator.choice(bursts)
+				value += int(generator.expovariate(1 / 30))
+			else:
+				value = first + span * i // rows + generator.randrange(60)
+				if generator.random() < 0.05:
+					# inserted up to a day after the time they record
+					value -= generator.randrange(86400)
+			times.append(value)
+		ids = self.seed_ids(
+			create,
+			create_many,
+			[{column_field: value} for value in times],
+		)
+		seeded = set(ids)
+
+		order = sorted(range(rows), key=times.__getitem__)
+		sorted_times = array('q', (times[position] for position in order))
+
+		def oracle(after, before):
+			# rows strictly between the cutoffs, either of which may be None
+			low = 0 if after is None else bisect.bisect_right(sorted_times, after)
+			high = rows if before is None else bisect.bisect_left(
+				sorted_times,
+				before,
+			)
+			return {ids[position] for position in order[low:high]}
+
+		def window(kind):
+			center = generator.choice(times)
+			if 'narrow' == kind:
+				width = generator.randint(1, 300)
+			elif 'wide' == kind:
+				width = generator.randint(86400, 30 * 86400)
+			elif generator.random() < 0.5:
+				return center, None
+			else:
+				return None, center
+			return center - width // 2, center + width - width // 2
+
+		search = self.indexed(search)
+		samples = {}
+		for i in range(queries):
+			for kind in ['narrow', 'wide', 'open']:
+				after, before = window(kind)
+				filter = {}
+				if after is not None:
+					filter[filter_field + '_after'] = after
+				if before is not None:
+					filter[filter_field + '_before'] = before
+				start = time.perf_counter_ns()
+				objects = search(filter=filter)
+				samples.setdefault(kind, []).append(
+					time.perf_counter_ns() - start
+				)
+				self.assertEqual(
+					oracle(after, before),
+					self.seeded_results(objects, seeded),
+					'{} window {} returned the wrong rows'.format(kind, filter),
+				)
+		summaries = {
+			kind: report_latency(
+				'search_by_time_cutoff_scaled ' + kind,
+				kind_samples,
+			)
+			for kind, kind_samples in samples.items()
+		}
+		self.assert_latency_budgets(
+			'search_by_time_cutoff_scaled',
+			summaries,
+			p95_ms,
+		)
+		return summaries
+
+	@helper(restores=True)
+	def search_by_string_like_scaled(
+			self,
+			create,
+			column_field,
+			search,
+			filter_field,
+			rows=100000,
+			queries=30,
+			p95_ms=None,
+			expect_index=False,
+			create_many=None,
+		):
+		# seeds a corpus of generated lowercase strings and checks exact,
+		# prefix abc%, suffix %abc and infix %abc% patterns against bisects
+		# of the sorted and reversed strings, reporting latency per class
+		# p95_ms optionally maps classes to budgets and expect_index holds
+		# exact and prefix patterns to assert_indexed_queries
+		generator = self.seeded_random('string_like')
+		syllables = [
+			consonant + vowel
+			for consonant in 'bdfgklmnprst'
+			for vowel in 'aeiou'
+		]
+		strings = [
+			''.join(
+				generator.choice(syllables)
+				for i in range(generator.randint(2, 6))
+			)
+			for i in range(rows)
+		]
+		ids = self.seed_ids(
+			create,
+			create_many,
+			[{column_field: value} for value in strings],
+		)
+		seeded = set(ids)
+
+		forward = sorted(range(rows), key=strings.__getitem__)
+		forward_strings = [strings[position] for position in forward]
+		backward = sorted(range(rows), key=lambda position: strings[position][::-1])
+		backward_strings = [strings[position][::-1] for position in backward]
+
+		def starting(order, sorted_strings, prefix, exact=False):
+			low = bisect.bisect_left(sorted_strings, prefix)
+			if exact:
+				high = bisect.bisect_right(sorted_strings, prefix)
+			else:
+				high = bisect.bisect_left(sorted_strings, prefix + '\U0010ffff')
+			return {ids[position] for position in order[low:high]}
+
+		def pattern(kind):
+			value = generator.choice(strings)
+			if 'exact' == kind:
+				return value, starting(forward, forward_strings, value, True)
+			length = generator.randint(2, min(4, len(value)))
+			if 'prefix' == kind:
+				part = value[:length]
+				return part + '%', starting(forward, forward_strings, part)
+			if 'suffix' == kind:
+				part = value[-length:]
+				return '%' + part, starting(backward, backward_strings, part[::-1])
+			offset = generator.randint(0, len(value) - length)
+			part = value[offset:offset + length]
+			return '%' + part + '%', {
+				ids[position] for position, string in enumerate(strings)
+				if part in string
+			}
+
+		indexed_search = self.indexed(search)
+		if expect_index:
+			checked_search = self.index_checked(indexed_search)
+		samples = {}
+		for i in range(queries):
+			for kind in ['exact', 'prefix', 'suffix', 'infix']:
+				value, expected = pattern(kind)
+				if expect_index and kind in ('exact', 'prefix'):
+					kind_search = checked_search
+				else:
+					kind_search = indexed_search
+				start = time.perf_counter_ns()
+				objects = kind_search(filter={filter_field: value})
+				samples.setdefault(kind, []).append(
+					time.perf_counter_ns() - start
+				)
+				self.assertEqual(
+					expected,
+					self.seeded_results(objects, seeded),
+					'{} pattern {!r} returned the wrong rows'.format(kind, value),
+				)
+		summaries = {
+			kind: report_latency(
+				'search_by_string_like_scaled ' + kind,
+				kind_samples,
+			)
+			for kind, kind_samples in samples.items()
+		}
+		self.assert_latency_budgets(
+			'search_by_string_like_scaled',
+			summaries,
+			p95_ms,
+		)
+		return summaries
+
+async def wait(value):
+	if inspect.isawaitable(value):
+		return await value
+	return value
+
+def bridged(f, loop):
+	# runs f on the event loop thread from a helper running in a worker
+	# thread and blocks until any awaitable it returns is done
+	# async iterators are consumed one item at a time
+	async def call(*args, **kwargs):
+		return await wait(f(*args, **kwargs))
+
+	def wrapper(*args, **kwargs):
+		result = asyncio.run_coroutine_threadsafe(
+			call(*args, **kwargs),
+			loop,
+		).result()
+		if isinstance(result, collections.abc.AsyncIterator):
+			return iterate_bridged(result, loop)
+		return result
+	return wrapper
+
+def iterate_bridged(iterator, loop):
+	while True:
+		try:
+			yield asyncio.run_coroutine_threadsafe(
+				wait(iterator.__anext__()),
+				loop,
+			).result()
+		except StopAsyncIteration:
+			return
+
+class AsyncTestHelper(TestHelper, unittest.IsolatedAsyncioTestCase):
+	# every TestHelper helper and assertion called from a test coroutine
+	# returns a coroutine that accepts async callables, see mirror below
+	pass
+
+def mirror(sync):
+	# the helper itself runs in a worker thread while every callable passed
+	# to it runs on the event loop, so data layers keep their loop and
+	# thread affinity
+	# bulk seeding falls back to create calls gathered concurrently
+	# helper bodies calling other helpers and assertions from the worker
+	# thread have no running loop there, and get the sync versions
+	signature = inspect.signature(sync)
+	keywords = [
+		name for name, parameter in signature.parameters.items()
+		if parameter.VAR_KEYWORD == parameter.kind
+	]
+
+	@functools.wraps(sync)
+	def method(self, *args, **kwargs):
+		try:
+			asyncio.get_running_loop()
+		except RuntimeError:
+			return sync(self, *args, **kwargs)
+		return run(self, *args, **kwargs)
+
+	async def run(self, *args, **kwargs):
+		loop = asyncio.get_running_loop()
+		bound = signature.bind(self, *args, **kwargs)
+		arguments = bound.arguments
+		targets = [arguments]
+		for name in keywords:
+			if name in arguments:
+				# helpers like search_scaling forward their keyword arguments
+				arguments[name] = dict(arguments[name])
+				targets.append(arguments[name])
+		for target in targets:
+			create = target.get('create')
+			if create and not target.get('create_many') and (
+					'create_many' in signature.parameters
+					or target is not arguments
+				):
+				target['create_many'] = functools.partial(gather_create, create)
+			for name, value in target.items():
+				if (
+						name in keywords
+						or value is self
+						or isinstance(value, type)
+						or not callable(value)
+					):
+					continue
+				if inspect.ismethod(value) and hasattr(value, 'sync'):
+					# mirrored helpers passed to other helpers, e.g. the
+					# helper argument of search_scaling
+					target[name] = types.MethodType(value.sync, value.__self__)
+				else:
+					target[name] = bridged(value, loop)
+
+		# the hooks are set in this task's context, which to_thread copies
+		# into the worker thread
+		hooks = types.SimpleNamespace(isolation=None, snapshot=None)
+		if self.isolation:
+			hooks.isolation = types.SimpleNamespace(
+				begin=bridged(self.isolation.begin, loop),
+				rollback=bridged(self.isolation.rollback, loop),
+			)
+		if self.snapshot:
+			hooks.snapshot = types.SimpleNamespace(
+				restore=bridged(self.snapshot.restore, loop),
+				clear=bridged(self.snapshot.clear, loop),
+				ids=self.snapshot.ids,
+			)
+		token = bridged_hooks.set(hooks)
+		try:
+			return await asyncio.to_thread(sync, *bound.args, **bound.kwargs)
+		finally:
+			bridged_hooks.reset(token)
+	method.sync = sync
+	return method
+
+async def gather_create(create, kwargs_list):
+	return list(await asyncio.gather(
+		*(wait(create(**kwargs)) for kwargs in kwargs_list)
+	))
+
+for name, value in list(vars(TestHelper).items()):
+	if getattr(value, 'helper', False) or name.startswith('assert_'):
+		setattr(AsyncTestHelper, name, mirror(value))
@@ -0,0 +1,182 @@
+import argparse
+import os
+import pstats
+import sys
+import tempfile
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+import testhelper
+from testhelper import IdFactory, TestHelper, profiles, timings, write_reports
+
+# shards discovered TestHelper subclasses across a process pool, giving
+# each worker its own database
+# python -m testhelper.runner [start] [-p pattern] [-j processes]
+
+def iterate_tests(suite):
+	for test in suite:
+		if isinstance(test, unittest.TestSuite):
+			yield from iterate_tests(test)
+		else:
+			yield test
+
+def summarize(result):
+	# test results hold test case instances and tracebacks, so only counts
+	# and formatted failures are passed back from the workers
+	return (
+		result.testsRun,
+		[(str(test), trace) for test, trace in result.failures],
+		[(str(test), trace) for test, trace in result.errors],
+		len(result.skipped),
+		len(result.expectedFailures),
+		[str(test) for test in result.unexpectedSuccesses],
+	)
+
+def run_shard(worker_id, database, top_level_dir, test_ids):
+	if top_level_dir not in sys.path:
+		sys.path.insert(0, top_level_dir)
+	suite = unittest.defaultTestLoader.loadTestsFromNames(test_ids)
+	for class_name in {test.__class__ for test in iterate_tests(suite)}:
+		class_name.setup_worker(worker_id, database)
+	result = unittest.TestResult()
+	suite.run(result)
+	# timings are returned so the parent prints a single merged table
+	# instead of each worker writing its own
+	shard_timings = dict(timings)
+	timings.clear()
+	ids_generated = IdFactory.used
+	IdFactory.used = False
+	# profiles are dumped next to the worker database for the parent to
+	# merge into one file per helper
+	shard_profiles = {}
+	for path, stats in profiles.items():
+		shard_path = os.path.join(
+			os.path.dirname(database),
+			'worker{}_{}.pstats'.format(worker_id, len(shard_profiles)),
+		)
+		stats.dump_stats(shard_path)
+		shard_profiles[path] = shard_path
+	profiles.clear()
+	return summarize(result), shard_timings, ids_generated, shard_profiles
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(
+		prog='python -m testhelper.runner',
+		description='run TestHelper suites sharded across processes',
+	)
+	parser.add_argument('start', nargs='?', default='.')
+	parser.add_argument('-p', '--pattern', default='test*.py')
+	parser.add_argument('-t', '--top-level-directory', default=None)
+	parser.add_argument('-j', '--processes', type=int, default=os.cpu_count())
+	args = parser.parse_args(argv)
+
+	top_level_dir = os.path.abspath(args.top_level_directory or args.start)
+	suite = unittest.defaultTestLoader.discover(
+		args.start,
+		args.pattern,
+		top_level_dir,
+	)
+	classes = {}
+	unsharded = unittest.TestSuite()
+	for test in iterate_tests(suite):
+		if isinstance(test, TestHelper):
+			classes.setdefault(test.__class__, []).append(test.id())
+		else:
+			# plain test cases and import failures run in this process
+			unsharded.addTest(test)
+	processes = max(1, min(args.processes, len(classes)))
+	# whole classes go to the shard with the fewest methods so far, largest
+	# first, so class fixtures like seed_snapshot only run in one worker
+	shards = [[] for i in range(processes)]
+	for test_ids in sorted(classes.values(), key=len, reverse=True):
+		min(shards, key=len).extend(test_ids)
+
+	# spawned workers would otherwise each pick their own seed
+	os.environ['TESTHELPER_SEED'] = str(testhelper.id_seed)
+	start = time.perf_counter()
+	summaries = []
+	with tempfile.TemporaryDirectory() as directory:
+		if classes:
+			with ProcessPoolExecutor(processes) as executor:
+				futures = [
+					executor.submit(
+						run_shard,
+						worker_id,
+						os.path.join(directory, 'worker{}.sqlite'.format(worker_id)),
+						top_level_dir,
+						shard,
+					)
+					for worker_id, shard in enumerate(shards)
+				]
+				for future in futures:
+					(
+						summary,
+						shard_timings,
+						ids_generated,
+						shard_profiles,
+					) = future.result()
+					summaries.append(summary)
+					for key, samples in shard_timings.items():
+						timings.setdefault(key, []).extend(samples)
+					if ids_generated:
+						IdFactory.used = True
+					for path, shard_path in shard_profiles.items():
+						if path in profiles:
+							profiles[path].add(shard_path)
+						else:
+							profiles[path] = pstats.Stats(shard_path)
+		result = unittest.TestResult()
+		unsharded.run(result)
+		summaries.append(summarize(result))
+	elapsed = time.perf_counter() - start
+	write_reports()
+
+	tests_run = 0
+	failures = []
+	errors = []
+	skipped = 0
+	expected_failures = 0
+	unexpected_successes = []
+	for summary in summaries:
+		tests_run += summary[0]
+		failures += summary[1]
+		errors += summary[2]
+		skipped += summary[3]
+		expected_failures += summary[4]
+		unexpected_successes += summary[5]
+
+	stream = sys.stderr
+	for flavour, problems in [('ERROR', errors), ('FAIL', failures)]:
+		for test, trace in problems:
+			stream.write('=' * 70 + '\n')
+			stream.write('{}: {}\n'.format(flavour, test))
+			stream.write('-' * 70 + '\n')
+			stream.write(trace + '\n')
+	stream.write('-' * 70 + '\n')
+	stream.write('Ran {} test{} in {:.3f}s across {} process{}\n\n'.format(
+		tests_run,
+		'' if 1 == tests_run else 's',
+		elapsed,
+		processes,
+		'' if 1 == processes else 'es',
+	))
+	details = []
+	for name, value in [
+			('failures', len(failures)),
+			('errors', len(errors)),
+			('skipped', skipped),
+			('expected failures', expected_failures),
+			('unexpected successes', len(unexpected_successes)),
+		]:
+		if value:
+			details.append('{}={}'.format(name, value))
+	successful = not failures and not errors and not unexpected_successes
+	stream.write('OK' if successful else 'FAILED')
+	if details:
+		stream.write(' ({})'.format(', '.join(details)))
+	stream.write('\n')
+	return 0 if successful else 1
+
+if __name__ == '__main__':
+	sys.exit(main())
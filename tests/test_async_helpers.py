@@ -0,0 +1,86 @@
+import asyncio
+import os
+import types
+import unittest
+
+from testhelper import AsyncTestHelper
+
+class AsyncStore:
+	# async data layer keeping objects in a list, with a search that can be
+	# broken to ignore its filters
+	def __init__(self, ignore_filters=False):
+		self.objects = []
+		self.ignore_filters = ignore_filters
+
+	async def create(self, creation_time=0):
+		object = types.SimpleNamespace(
+			id_bytes=os.urandom(16),
+			creation_time=int(creation_time),
+		)
+		self.objects.append(object)
+		return object
+
+	async def search(self, filter={}):
+		if self.ignore_filters:
+			return list(self.objects)
+		objects = self.objects
+		for field, value in filter.items():
+			if not isinstance(value, (int, float)):
+				return []
+			if 'created_before' == field:
+				objects = [o for o in objects if o.creation_time < value]
+			elif 'created_after' == field:
+				objects = [o for o in objects if o.creation_time > value]
+		return objects
+
+class CountingIsolation:
+	def __init__(self):
+		self.begun = 0
+		self.rolled_back = 0
+
+	def begin(self):
+		self.begun += 1
+
+	def rollback(self):
+		self.rolled_back += 1
+
+class TestAsyncHelpers(AsyncTestHelper):
+	async def test_time_cutoff(self):
+		store = AsyncStore()
+		await self.search_by_time_cutoff(
+			store.create,
+			'creation_time',
+			store.search,
+			'created',
+		)
+
+	async def test_nested_helper_failure(self):
+		# search_by_time_cutoff runs search_by_int_cutoff from the worker
+		# thread, which has to run rather than return an unawaited coroutine
+		store = AsyncStore(ignore_filters=True)
+		with self.assertRaises(AssertionError):
+			await self.search_by_time_cutoff(
+				store.create,
+				'creation_time',
+				store.search,
+				'created',
+			)
+
+	async def test_concurrent_helpers(self):
+		# each helper bridges its own isolation hooks and isolates once
+		self.isolation = CountingIsolation()
+		stores = [AsyncStore(), AsyncStore()]
+		await asyncio.gather(*(
+			self.search_by_time_cutoff(
+				store.create,
+				'creation_time',
+				store.search,
+				'created',
+			)
+			for store in stores
+		))
+		self.assertEqual(2, self.isolation.begun)
+		self.assertEqual(2, self.isolation.rolled_back)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,50 @@
+import sqlite3
+import unittest
+
+from testhelper import StatementRecorder, TestHelper
+
+class TestIndexedQueries(TestHelper):
+	def setUp(self):
+		self.connection = sqlite3.connect(':memory:')
+		self.addCleanup(self.connection.close)
+		self.connection.execute(
+			'CREATE TABLE objects (id INTEGER PRIMARY KEY, n INT, flag INT)'
+		)
+		self.connection.execute('CREATE INDEX objects_n ON objects (n)')
+		self.statement_recorder = StatementRecorder(self.connection)
+		self.addCleanup(self.statement_recorder.close)
+
+	def query(self, statement):
+		return lambda: self.connection.execute(statement).fetchall()
+
+	def test_indexed_filter(self):
+		self.assert_indexed_queries(
+			self.query('SELECT * FROM objects WHERE n = 1'),
+		)
+		self.assert_indexed_queries(
+			self.query('SELECT * FROM objects WHERE id = 1'),
+		)
+
+	def test_sorted_scan_of_unindexed_filter(self):
+		# the plan is SCAN objects USING INDEX objects_n, a full pass
+		with self.assertRaises(AssertionError):
+			self.assert_indexed_queries(
+				self.query('SELECT * FROM objects WHERE flag = 1 ORDER BY n'),
+			)
+
+	def test_covering_index_scan(self):
+		with self.assertRaises(AssertionError):
+			self.assert_indexed_queries(
+				self.query('SELECT n FROM objects WHERE n + 1 = 2'),
+			)
+
+	def test_statements_recorded_only_during_checks(self):
+		self.query('SELECT * FROM objects')()
+		self.assert_max_queries(1, self.query('SELECT * FROM objects'))
+		with self.assertRaises(AssertionError):
+			self.assert_max_queries(0, self.query('SELECT * FROM objects'))
+		self.query('SELECT * FROM objects')()
+		self.assertEqual([], self.statement_recorder.statements)
+
+if __name__ == '__main__':
+	unittest.main()
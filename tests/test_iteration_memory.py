@@ -0,0 +1,34 @@
+import os
+import types
+import unittest
+
+from testhelper import TestHelper
+
+def rows(count):
+	return [
+		types.SimpleNamespace(id_bytes=os.urandom(16), n=i)
+		for i in range(count)
+	]
+
+class TestIterationMemory(TestHelper):
+	max_iteration_memory = 64 * 1024
+
+	def streamed(self, count):
+		for i in range(count):
+			yield types.SimpleNamespace(id_bytes=os.urandom(16), n=i)
+
+	def test_streamed_search(self):
+		for count in [5000, 80000]:
+			objects = self.indexed(self.streamed)(count)
+			self.assertEqual(count, len(objects))
+
+	def test_materialized_search(self):
+		with self.assertRaises(AssertionError):
+			self.indexed(rows)(80000)
+
+	def test_materialized_behind_generator(self):
+		with self.assertRaises(AssertionError):
+			self.indexed(lambda count: iter(rows(count)))(80000)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,66 @@
+import os
+import sqlite3
+import types
+import unittest
+
+from base64_url import base64_url_encode, base64_url_decode
+
+from testhelper import IsolatedConnection, SQLiteSavepointIsolation, TestHelper
+
+class SQLiteStore:
+	# data layer that commits after every write and rolls back after a
+	# failed one
+	def __init__(self, connection):
+		self.connection = connection
+		self.connection.execute('CREATE TABLE objects (id BLOB PRIMARY KEY)')
+		self.connection.commit()
+
+	def create(self, id=None):
+		if id is None:
+			id_bytes = os.urandom(16)
+		elif isinstance(id, bytes):
+			id_bytes = id
+		else:
+			id_bytes = base64_url_decode(id)
+		try:
+			self.connection.execute(
+				'INSERT INTO objects (id) VALUES (?)',
+				(id_bytes,),
+			)
+			self.connection.commit()
+		except sqlite3.Error:
+			self.connection.rollback()
+			raise
+		return types.SimpleNamespace(
+			id=base64_url_encode(id_bytes),
+			id_bytes=id_bytes,
+		)
+
+	def count(self):
+		return self.connection.execute(
+			'SELECT COUNT(*) FROM objects'
+		).fetchone()[0]
+
+class TestSQLiteIsolation(TestHelper):
+	def setUp(self):
+		connection = sqlite3.connect(':memory:', factory=IsolatedConnection)
+		self.addCleanup(connection.close)
+		self.store = SQLiteStore(connection)
+		self.isolation = SQLiteSavepointIsolation(connection)
+
+	def test_rows_rolled_back(self):
+		kept = self.store.create()
+		self.id_collision(self.store.create)
+		self.assertEqual(1, self.store.count())
+		# rows committed outside of helpers are left alone
+		with self.assertRaises(sqlite3.IntegrityError):
+			self.store.create(id=kept.id_bytes)
+
+	def test_collision_rollback_keeps_seeded_rows(self):
+		# the rollback after the first colliding create only undoes that
+		# create, so the second one still collides with the seeded row
+		self.id_collision(self.store.create)
+		self.assertEqual(0, self.store.count())
+
+if __name__ == '__main__':
+	unittest.main()